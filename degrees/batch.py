@@ -0,0 +1,111 @@
+import csv
+import json
+import multiprocessing
+import os
+import sys
+
+from graph import load_graph
+from names import load_names
+
+# Graph and name index shared read-only with forked worker processes
+graph = None
+name_index = None
+
+
+def main():
+    if len(sys.argv) not in [3, 4]:
+        sys.exit("Usage: python batch.py directory pairs.csv [processes]")
+    directory, filename = sys.argv[1:3]
+    processes = int(sys.argv[3]) if len(sys.argv) == 4 else os.cpu_count()
+
+    global graph, name_index
+    graph = load_graph(directory)
+    name_index = load_names(directory, graph)
+
+    with open(filename, encoding="utf-8") as f:
+        pairs = [row for row in csv.reader(f) if row]
+    for result in solve_pairs(pairs, processes):
+        print(json.dumps(result), flush=True)
+
+
+def solve_pairs(pairs, processes):
+    """
+    Yield one result per (source, target) pair of names or IDs, as soon as it
+    is known. Pairs are grouped by source so that each distinct source needs a
+    single breadth-first search, and sources are spread across `processes`
+    forked workers that share the module-level `graph`.
+    """
+    targets_by_source = {}
+    for line, row in enumerate(pairs, 1):
+        if len(row) != 2:
+            yield {"line": line, "error": "expected a source and a target"}
+            continue
+        (source, source_error), (target, target_error) = (resolve_person(value) for value in row)
+        if source_error or target_error:
+            yield {"line": line, "error": source_error or target_error}
+            continue
+        targets_by_source.setdefault(source, []).append((line, target))
+
+    jobs = list(targets_by_source.items())
+    if processes <= 1 or len(jobs) <= 1:
+        for job in jobs:
+            yield from solve_source(job)
+        return
+
+    context = multiprocessing.get_context("fork")
+    with context.Pool(processes) as pool:
+        for results in pool.imap_unordered(solve_source, jobs):
+            yield from results
+
+
+def solve_source(job):
+    """
+    Return the results for all (line, target) pairs of one source,
+    searching outwards from the source only until every target is reached.
+    """
+    source, targets = job
+    tree = graph.bfs_tree(source, [target for line, target in targets])
+    results = []
+    for line, target in targets:
+        results.append({"line": line, **path_result(source, target, graph.tree_path(tree, target))})
+    return results
+
+
+def path_result(source, target, path):
+    """
+    Return the JSON-ready result for a path of (movie, person) indices
+    between two people, or for None if they are not connected.
+    """
+    return {
+        "source": graph.person_ids[source],
+        "target": graph.person_ids[target],
+        "degrees": None if path is None else len(path),
+        "path": None if path is None else [
+            {"movie_id": movie_id, "person_id": person_id}
+            for movie_id, person_id in graph.path_ids(path)
+        ],
+    }
+
+
+def resolve_person(value):
+    """
+    Return (person index, None) for an IMDB ID or an unambiguous name,
+    or (None, error message) if the value matches nobody or several people.
+    """
+    person = graph.person_for_id(value)
+    if person is not None:
+        return person, None
+    people = graph.people_for_name(value)
+    if len(people) == 0:
+        suggestions = ", ".join(candidate["person_id"] for candidate in name_index.search(value))
+        if not suggestions:
+            return None, f"person not found: {value}"
+        return None, f"person not found: {value} (closest IDs {suggestions})"
+    elif len(people) > 1:
+        ids = ", ".join(graph.person_ids[person] for person in people)
+        return None, f"ambiguous name: {value} (IDs {ids})"
+    return people[0], None
+
+
+if __name__ == "__main__":
+    main()
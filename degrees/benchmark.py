@@ -0,0 +1,106 @@
+import random
+import sys
+import time
+
+from graph import load_graph
+from landmarks import load_landmarks
+from util import Node, StackFrontier, QueueFrontier, DequeStackFrontier, DequeQueueFrontier
+
+# Frontier sizes to benchmark when none are given on the command line
+SIZES = [10 ** 5, 3 * 10 ** 5, 10 ** 6]
+
+# The list-backed frontiers copy on every remove, so they are skipped above this size
+LIST_FRONTIER_LIMIT = 10 ** 5
+
+
+def main():
+    if len(sys.argv) < 2 or sys.argv[1] not in COMMANDS:
+        sys.exit(f"Usage: python benchmark.py ({'|'.join(COMMANDS)}) [args...]")
+    COMMANDS[sys.argv[1]](sys.argv[2:])
+
+
+def frontiers(args):
+    """
+    Time filling, probing and draining each frontier class
+    with `n` nodes, for every size given in `args`.
+    """
+    sizes = [int(arg) for arg in args] or SIZES
+    classes = [StackFrontier, DequeStackFrontier, QueueFrontier, DequeQueueFrontier]
+    for n in sizes:
+        print(f"n = {n}")
+        for frontier_class in classes:
+            name = frontier_class.__name__
+            if frontier_class in (StackFrontier, QueueFrontier) and n > LIST_FRONTIER_LIMIT:
+                print(f"  {name:20} skipped (quadratic)")
+                continue
+            elapsed = time_frontier(frontier_class, n)
+            print(f"  {name:20} {elapsed:8.3f}s  {n / elapsed:12,.0f} nodes/s")
+
+
+def time_frontier(frontier_class, n):
+    """
+    Return the seconds taken to add `n` nodes to a fresh frontier, check
+    membership for a handful of states and then remove every node.
+    """
+    nodes = [Node(i, None, None) for i in range(n)]
+    start = time.perf_counter()
+    frontier = frontier_class()
+    for node in nodes:
+        frontier.add(node)
+    for state in range(0, n, max(1, n // 100)):
+        frontier.contains_state(state)
+    while not frontier.empty():
+        frontier.remove()
+    return time.perf_counter() - start
+
+
+def landmarks(args):
+    """
+    Compare breadth-first searches with landmark (ALT) A* search and
+    landmark bounds on random pairs from the dataset directory in `args`.
+    """
+    if len(args) not in [1, 2]:
+        sys.exit("Usage: python benchmark.py landmarks directory [pairs]")
+    graph = load_graph(args[0])
+    count = int(args[1]) if len(args) == 2 else 100
+
+    start = time.perf_counter()
+    index = load_landmarks(args[0], graph)
+    print(f"Landmark index ready in {time.perf_counter() - start:.3f}s")
+
+    random.seed(0)
+    size = len(graph.person_ids)
+    pairs = [(random.randrange(size), random.randrange(size)) for i in range(count)]
+    searches = [
+        ("bidirectional BFS", graph.shortest_path),
+        ("BFS tree", lambda s, t: graph.tree_path(graph.bfs_tree(s, [t]), t)),
+        ("ALT A*", lambda s, t: index.shortest_path(graph, s, t)),
+    ]
+    lengths = {}
+    for name, search in searches:
+        start = time.perf_counter()
+        lengths[name] = [len(path) if path is not None else None for path in
+                         (search(source, target) for source, target in pairs)]
+        elapsed = time.perf_counter() - start
+        print(f"  {name:20} {elapsed:8.3f}s  {elapsed / count * 1000:8.3f} ms/query")
+    if len(set(map(tuple, lengths.values()))) != 1:
+        print("  WARNING: searches disagree on path lengths")
+
+    start = time.perf_counter()
+    bounds = [index.bounds(source, target) for source, target in pairs]
+    elapsed = time.perf_counter() - start
+    exact = sum(
+        1 for bound, length in zip(bounds, lengths["bidirectional BFS"])
+        if bound is not None and length is not None and bound[0] == length == bound[1]
+    )
+    print(f"  {'bounds':20} {elapsed:8.3f}s  {elapsed / count * 1000:8.3f} ms/query, exact for {exact}/{count}")
+
+
+COMMANDS = {
+    "frontiers": frontiers,
+    "landmarks": landmarks,
+}
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,10 @@
 import csv
 import sys
+from collections import deque
 
-from util import Node, StackFrontier, QueueFrontier
+from graph import load_graph
+from names import load_names
+from util import join_paths
 
 # Maps names to a set of corresponding person_ids
 names = {}
@@ -59,17 +62,18 @@ def main():
 
     # Load data from files into memory
     print("Loading data...")
-    load_data(directory)
+    graph = load_graph(directory)
+    name_index = load_names(directory, graph)
     print("Data loaded.")
 
-    source = person_id_for_name(input("Name: "))
+    source = person_for_name(graph, name_index, input("Name: "))
     if source is None:
         sys.exit("Person not found.")
-    target = person_id_for_name(input("Name: "))
+    target = person_for_name(graph, name_index, input("Name: "))
     if target is None:
         sys.exit("Person not found.")
 
-    path = shortest_path(source, target)
+    path = graph.shortest_path(source, target)
 
     if path is None:
         print("Not connected.")
@@ -78,9 +82,9 @@ def main():
         print(f"{degrees} degrees of separation.")
         path = [(None, source)] + path
         for i in range(degrees):
-            person1 = people[path[i][1]]["name"]
-            person2 = people[path[i + 1][1]]["name"]
-            movie = movies[path[i + 1][0]]["title"]
+            person1 = graph.person_names[path[i][1]]
+            person2 = graph.person_names[path[i + 1][1]]
+            movie = graph.movie_titles[path[i + 1][0]]
             print(f"{i + 1}: {person1} and {person2} starred in {movie}")
 
 
@@ -91,22 +95,25 @@ def shortest_path(source, target):
 
     If no possible path, returns None.
     """
-    # TODO
-    queue = QueueFrontier()
-    queue.add([[],source])
-    visited = set()
-    visited.add(source)
-    while not queue.empty():
-        node = queue.remove()
-        (visit_path, person_id) = node
-        if person_id == target:
-            return visit_path
+    if source == target:
+        return []
+
+    # Maps each reached person to the (movie_id, person_id) step that reached
+    # them, which doubles as the visited set; the path is rebuilt only once
+    parents = {source: None}
+    queue = deque([source])
+    while queue:
+        person_id = queue.popleft()
         for movie_id, nperson_id in neighbors_for_person(person_id):
-            if nperson_id not in visited:
-                visited.add(nperson_id)
-                queue.add([visit_path+[(movie_id, nperson_id)],nperson_id])
+            if nperson_id in parents:
+                continue
+            parents[nperson_id] = (movie_id, person_id)
+            if nperson_id == target:
+                return join_paths(target, parents, {target: None})
+            queue.append(nperson_id)
     return None
 
+
 def person_id_for_name(name):
     """
     Returns the IMDB id for a person's name,
@@ -133,6 +140,36 @@ def person_id_for_name(name):
         return person_ids[0]
 
 
+def person_for_name(graph, name_index, name):
+    """
+    Returns the person index in `graph` for a person's name,
+    resolving ambiguities and misspellings as needed.
+    """
+    people = graph.people_for_name(name)
+    if len(people) == 1:
+        return people[0]
+    elif len(people) > 1:
+        print(f"Which '{name}'?")
+    else:
+        people = [graph.person_for_id(candidate["person_id"]) for candidate in name_index.search(name)]
+        if len(people) == 0:
+            return None
+        print(f"No exact match for '{name}'. Did you mean:")
+
+    for person in people:
+        person_id = graph.person_ids[person]
+        name = graph.person_names[person]
+        birth = graph.person_births[person]
+        print(f"ID: {person_id}, Name: {name}, Birth: {birth}")
+    try:
+        person = graph.person_for_id(input("Intended Person ID: "))
+        if person in people:
+            return person
+    except ValueError:
+        pass
+    return None
+
+
 def neighbors_for_person(person_id):
     """
     Returns (movie_id, person_id) pairs for people
@@ -0,0 +1,583 @@
+import csv
+import mmap
+import os
+import resource
+import struct
+import sys
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import Counter
+
+from util import join_paths
+
+# Typecodes for CSR offsets (may exceed 2**31 on large dumps) and for indices
+OFFSET_TYPE = "q"
+INDEX_TYPE = "i"
+
+# Snapshot file written next to the CSVs, and its format version
+SNAPSHOT_NAME = "graph.snapshot"
+SNAPSHOT_MAGIC = b"DEGREES\0"
+SNAPSHOT_VERSION = 1
+
+# CSV files whose mtime and size are recorded in, and validate, a snapshot
+SOURCES = ["people.csv", "movies.csv", "stars.csv"]
+
+# Snapshot sections: numeric arrays, then string tables stored as offsets + UTF-8 data
+ARRAY_SECTIONS = [
+    ("person_offsets", OFFSET_TYPE),
+    ("person_movies", INDEX_TYPE),
+    ("movie_offsets", OFFSET_TYPE),
+    ("movie_stars", INDEX_TYPE),
+    ("name_order", INDEX_TYPE),
+    ("id_order", INDEX_TYPE),
+]
+STRING_SECTIONS = [
+    "person_ids", "person_names", "person_births",
+    "movie_ids", "movie_titles", "movie_years",
+]
+
+# Read buffer for streaming the CSV files
+BUFFER_SIZE = 1 << 20
+
+HEADER = struct.Struct("<8sI4x" + "qq" * len(SOURCES))
+SECTION = struct.Struct("<qq")
+
+
+def main():
+    if len(sys.argv) < 2:
+        sys.exit("Usage: python graph.py directory [seed_person_id ...]")
+    directory, seeds = sys.argv[1], sys.argv[2:]
+    stats = LoadStats()
+    graph = StarGraph.from_csv(directory, seeds=seeds or None, stats=stats)
+    print(stats.report())
+
+    # A seeded subgraph would pass the snapshot's staleness check, so never save one
+    if seeds:
+        print(f"Loaded {len(graph.person_ids)} people, {len(graph.movie_ids)} movies reachable from the seeds.")
+    else:
+        path = graph.save_snapshot(directory)
+        print(f"Wrote {path}: {len(graph.person_ids)} people, {len(graph.movie_ids)} movies.")
+
+
+def load_graph(directory):
+    """
+    Load the graph for `directory` from its snapshot if that is still
+    current, otherwise parse the CSVs and write a fresh snapshot.
+    """
+    graph = StarGraph.from_snapshot(directory)
+    if graph is None:
+        graph = StarGraph.from_csv(directory)
+        try:
+            graph.save_snapshot(directory)
+        except OSError:
+            pass
+    return graph
+
+
+class StarGraph():
+    """
+    People and movies interned to dense integer indices, with the bipartite
+    graph of who starred in what stored as two CSR adjacency structures:
+    `person_movies[person_offsets[p]:person_offsets[p + 1]]` are the movies
+    of person `p`, and `movie_stars[movie_offsets[m]:movie_offsets[m + 1]]`
+    are the stars of movie `m`.
+
+    `name_order` and `id_order` list every person index sorted by lower-cased
+    name and by ID, so that both lookups are binary searches.
+    """
+    def __init__(self, person_ids, person_names, person_births,
+                 movie_ids, movie_titles, movie_years,
+                 person_offsets, person_movies, movie_offsets, movie_stars,
+                 name_order, id_order, snapshot=None):
+        self.person_ids = person_ids
+        self.person_names = person_names
+        self.person_births = person_births
+        self.movie_ids = movie_ids
+        self.movie_titles = movie_titles
+        self.movie_years = movie_years
+        self.person_offsets = person_offsets
+        self.movie_offsets = movie_offsets
+        self.name_order = name_order
+        self.id_order = id_order
+
+        # Slicing a memoryview does not copy, so neighbor iteration allocates nothing
+        self.person_movies = memoryview(person_movies)
+        self.movie_stars = memoryview(movie_stars)
+
+        # Memory map backing the arrays and strings, if loaded from a snapshot
+        self.snapshot = snapshot
+
+    @classmethod
+    def from_csv(cls, directory, seeds=None, stats=None):
+        """
+        Stream the people, movies and stars CSV files in `directory` into a graph.
+        Stars whose person or movie is unknown are dropped.
+
+        If `seeds` is a collection of person IDs, only the people and movies
+        reachable from them are loaded. If `stats` is a LoadStats, it is
+        filled in with row counts, timings and dropped rows.
+        """
+        if stats is None:
+            stats = LoadStats()
+        people, movies, stars = None, None, None
+        if seeds is not None:
+            people, movies, stars = reachable(directory, seeds, stats)
+
+        # Repeated names and years share one string object
+        strings = {}
+
+        person_ids, person_names, person_births = [], [], []
+        person_index = {}
+        for person_id, name, birth in read_rows(directory, "people.csv", ["id", "name", "birth"], stats):
+            if people is not None and person_id not in people:
+                continue
+            person_index[person_id] = len(person_ids)
+            person_ids.append(person_id)
+            person_names.append(strings.setdefault(name, name))
+            person_births.append(strings.setdefault(birth, birth))
+
+        movie_ids, movie_titles, movie_years = [], [], []
+        movie_index = {}
+        for movie_id, title, year in read_rows(directory, "movies.csv", ["id", "title", "year"], stats):
+            if movies is not None and movie_id not in movies:
+                continue
+            movie_index[movie_id] = len(movie_ids)
+            movie_ids.append(movie_id)
+            movie_titles.append(title)
+            movie_years.append(strings.setdefault(year, year))
+        strings.clear()
+
+        star_people = array(INDEX_TYPE)
+        star_movies = array(INDEX_TYPE)
+        if stars is None:
+            stars = read_rows(directory, "stars.csv", ["person_id", "movie_id"], stats)
+        for person_id, movie_id in stars:
+            person = person_index.get(person_id)
+            movie = movie_index.get(movie_id)
+            if person is None or movie is None:
+                if people is None or person_id in people:
+                    stats.dropped["stars.csv"] += 1
+                continue
+            star_people.append(person)
+            star_movies.append(movie)
+        del person_index, movie_index, stars
+
+        person_offsets, person_movies = build_csr(len(person_ids), star_people, star_movies)
+        movie_offsets, movie_stars = build_csr(len(movie_ids), star_movies, star_people)
+        del star_people, star_movies
+        name_order = array(INDEX_TYPE, sorted(range(len(person_ids)), key=lambda p: person_names[p].lower()))
+        id_order = array(INDEX_TYPE, sorted(range(len(person_ids)), key=person_ids.__getitem__))
+        stats.peak_memory = peak_memory()
+        return cls(person_ids, person_names, person_births,
+                   movie_ids, movie_titles, movie_years,
+                   person_offsets, person_movies, movie_offsets, movie_stars,
+                   name_order, id_order)
+
+    @classmethod
+    def from_snapshot(cls, directory):
+        """
+        Memory-map the snapshot in `directory` and return its graph,
+        or None if there is no snapshot or it is stale, from another version,
+        or truncated or otherwise inconsistent.
+        """
+        try:
+            with open(os.path.join(directory, SNAPSHOT_NAME), "rb") as f:
+                buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None
+
+        view = memoryview(buffer)
+        try:
+            magic, version, *signature = HEADER.unpack_from(view)
+            if (magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION or
+                    signature != source_signature(directory)):
+                raise ValueError("stale snapshot")
+
+            sections = {}
+            position = HEADER.size
+            for name, typecode in ARRAY_SECTIONS:
+                start, length = SECTION.unpack_from(view, position)
+                position += SECTION.size
+                sections[name] = snapshot_section(view, start, length).cast(typecode)
+            for name in STRING_SECTIONS:
+                offsets_start, offsets_length, data_start, data_length = \
+                    SECTION.unpack_from(view, position) + SECTION.unpack_from(view, position + SECTION.size)
+                position += 2 * SECTION.size
+                sections[name] = StringTable(
+                    snapshot_section(view, offsets_start, offsets_length).cast(OFFSET_TYPE),
+                    snapshot_section(view, data_start, data_length)
+                )
+            check_sections(sections)
+        except (OSError, ValueError, TypeError, struct.error):
+            return None
+
+        return cls(snapshot=buffer, **sections)
+
+    def save_snapshot(self, directory):
+        """
+        Write this graph as a versioned binary snapshot in `directory`,
+        stamped with the current mtimes and sizes of the CSVs, and return its path.
+        """
+        blobs = []
+        for name, _ in ARRAY_SECTIONS:
+            blobs.append(memoryview(getattr(self, name)).cast("B"))
+        for name in STRING_SECTIONS:
+            encoded = [value.encode("utf-8") for value in getattr(self, name)]
+            offsets = array(OFFSET_TYPE, [0])
+            for value in encoded:
+                offsets.append(offsets[-1] + len(value))
+            blobs.append(memoryview(offsets).cast("B"))
+            blobs.append(b"".join(encoded))
+
+        # Lay the sections out after the header and table, each 8-byte aligned
+        position = HEADER.size + SECTION.size * len(blobs)
+        table = []
+        for blob in blobs:
+            position += -position % 8
+            table.append((position, len(blob)))
+            position += len(blob)
+
+        path = os.path.join(directory, SNAPSHOT_NAME)
+        temporary = path + ".tmp"
+        with open(temporary, "wb") as f:
+            f.write(HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, *source_signature(directory)))
+            for start, length in table:
+                f.write(SECTION.pack(start, length))
+            for blob, (start, length) in zip(blobs, table):
+                f.write(bytes(start - f.tell()))
+                f.write(blob)
+        os.replace(temporary, path)
+        return path
+
+    def movies_for_person(self, person):
+        """
+        Returns the movie indices of a person as a zero-copy slice.
+        """
+        return self.person_movies[self.person_offsets[person]:self.person_offsets[person + 1]]
+
+    def stars_for_movie(self, movie):
+        """
+        Returns the person indices of a movie's stars as a zero-copy slice.
+        """
+        return self.movie_stars[self.movie_offsets[movie]:self.movie_offsets[movie + 1]]
+
+    def neighbors(self, person):
+        """
+        Yields (movie, person) index pairs for people
+        who starred with a given person.
+        """
+        for movie in self.movies_for_person(person):
+            for star in self.stars_for_movie(movie):
+                yield movie, star
+
+    def shortest_path(self, source, target):
+        """
+        Returns the shortest list of (movie, person) index pairs that connect
+        the source to the target, using a bidirectional breadth-first search.
+
+        If no possible path, returns None.
+        """
+        if source == target:
+            return []
+
+        # Parent pointers towards the source / target, plus the movies each
+        # side has already expanded: a movie never needs expanding twice
+        forward = {source: None}
+        backward = {target: None}
+        forward_movies = set()
+        backward_movies = set()
+        forward_frontier = [source]
+        backward_frontier = [target]
+
+        while forward_frontier and backward_frontier:
+            expand_forward = len(forward_frontier) <= len(backward_frontier)
+            if expand_forward:
+                frontier, reached, other, expanded = forward_frontier, forward, backward, forward_movies
+            else:
+                frontier, reached, other, expanded = backward_frontier, backward, forward, backward_movies
+
+            next_frontier = []
+            for person in frontier:
+                for movie in self.movies_for_person(person):
+                    if movie in expanded:
+                        continue
+                    expanded.add(movie)
+                    for star in self.stars_for_movie(movie):
+                        if star in reached:
+                            continue
+                        reached[star] = (movie, person)
+                        if star in other:
+                            return join_paths(star, forward, backward)
+                        next_frontier.append(star)
+
+            if expand_forward:
+                forward_frontier = next_frontier
+            else:
+                backward_frontier = next_frontier
+        return None
+
+    def bfs_tree(self, source, targets=None):
+        """
+        Runs a breadth-first search from `source` and returns the search tree
+        as (parent_movies, parent_people) arrays indexed by person: the source
+        is its own parent and unreached people have -1. If `targets` is given,
+        the search stops once every target has been reached.
+        """
+        parent_movies = array(INDEX_TYPE, [-1]) * len(self.person_ids)
+        parent_people = array(INDEX_TYPE, [-1]) * len(self.person_ids)
+        expanded = bytearray(len(self.movie_ids))
+        remaining = None if targets is None else set(targets) - {source}
+
+        parent_people[source] = source
+        frontier = [source]
+        while frontier and remaining != set():
+            next_frontier = []
+            for person in frontier:
+                for movie in self.movies_for_person(person):
+                    if expanded[movie]:
+                        continue
+                    expanded[movie] = 1
+                    for star in self.stars_for_movie(movie):
+                        if parent_people[star] != -1:
+                            continue
+                        parent_movies[star] = movie
+                        parent_people[star] = person
+                        next_frontier.append(star)
+                        if remaining is not None:
+                            remaining.discard(star)
+            frontier = next_frontier
+        return parent_movies, parent_people
+
+    def tree_path(self, tree, target):
+        """
+        Returns the (movie, person) index path from the root of a `bfs_tree`
+        to `target`, or None if the search never reached the target.
+        """
+        parent_movies, parent_people = tree
+        if parent_people[target] == -1:
+            return None
+        path = []
+        person = target
+        while parent_people[person] != person:
+            path.append((parent_movies[person], person))
+            person = parent_people[person]
+        path.reverse()
+        return path
+
+    def path_ids(self, path):
+        """
+        Converts a path of (movie, person) indices into (movie_id, person_id) pairs.
+        """
+        return [(self.movie_ids[movie], self.person_ids[person]) for movie, person in path]
+
+    def people_for_name(self, name):
+        """
+        Returns the list of person indices whose name matches `name`,
+        ignoring case.
+        """
+        name = name.lower()
+        key = lambda person: self.person_names[person].lower()
+        start = bisect_left(self.name_order, name, key=key)
+        end = bisect_right(self.name_order, name, lo=start, key=key)
+        return list(self.name_order[start:end])
+
+    def person_for_id(self, person_id):
+        """
+        Returns the person index for an IMDB person ID, or None if unknown.
+        """
+        i = bisect_left(self.id_order, person_id, key=self.person_ids.__getitem__)
+        if i < len(self.id_order) and self.person_ids[self.id_order[i]] == person_id:
+            return self.id_order[i]
+        return None
+
+
+class LoadStats():
+    """
+    Rows read, rows dropped and seconds spent per CSV file while loading,
+    plus the peak resident memory of the process afterwards.
+    """
+    def __init__(self):
+        self.rows = Counter()
+        self.dropped = Counter()
+        self.seconds = Counter()
+        self.peak_memory = None
+
+    def report(self):
+        """
+        Returns a human-readable summary, one line per file.
+        """
+        lines = []
+        for name in self.rows:
+            rate = self.rows[name] / self.seconds[name] if self.seconds[name] else 0
+            lines.append(f"{name}: {self.rows[name]} rows in {self.seconds[name]:.2f}s "
+                         f"({rate:,.0f} rows/s), {self.dropped[name]} dropped")
+        if self.peak_memory is not None:
+            lines.append(f"Peak memory: {self.peak_memory / 2 ** 20:.1f} MiB")
+        return "\n".join(lines)
+
+
+class StringTable():
+    """
+    Read-only sequence of strings stored as UTF-8 `data`, where string `i`
+    spans `data[offsets[i]:offsets[i + 1]]`. Strings are decoded on access.
+    """
+    def __init__(self, offsets, data):
+        self.offsets = offsets
+        self.data = data
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        if not 0 <= i < len(self):
+            raise IndexError("string table index out of range")
+        return str(self.data[self.offsets[i]:self.offsets[i + 1]], "utf-8")
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+
+def snapshot_section(view, start, length):
+    """
+    Return `view[start:start + length]`, raising ValueError if the section
+    does not lie within the snapshot, where slicing would silently return
+    a shorter view.
+    """
+    if start < 0 or length < 0 or start + length > len(view):
+        raise ValueError("snapshot section out of bounds")
+    return view[start:start + length]
+
+
+def check_sections(sections):
+    """
+    Raise ValueError unless the snapshot sections agree with each other:
+    per-person and per-movie tables of the same lengths, CSR offsets that
+    end at their adjacency lists, and string offsets that end at their data.
+    """
+    for name in STRING_SECTIONS:
+        table = sections[name]
+        if len(table.offsets) == 0 or table.offsets[-1] != len(table.data):
+            raise ValueError(f"inconsistent snapshot section {name}")
+    people = len(sections["person_ids"])
+    movies = len(sections["movie_ids"])
+    expected = {
+        "person_offsets": people + 1, "person_names": people, "person_births": people,
+        "name_order": people, "id_order": people,
+        "movie_offsets": movies + 1, "movie_titles": movies, "movie_years": movies,
+    }
+    for name, length in expected.items():
+        if len(sections[name]) != length:
+            raise ValueError(f"inconsistent snapshot section {name}")
+    if (sections["person_offsets"][-1] != len(sections["person_movies"]) or
+            sections["movie_offsets"][-1] != len(sections["movie_stars"])):
+        raise ValueError("inconsistent snapshot adjacency")
+
+
+def read_rows(directory, name, columns, stats):
+    """
+    Stream the `columns` of each row of CSV file `name` in `directory` as tuples,
+    using the header to find column positions. Rows too short to hold every
+    column are counted as dropped in `stats`.
+    """
+    start = time.perf_counter()
+    with open(os.path.join(directory, name), encoding="utf-8", newline="", buffering=BUFFER_SIZE) as f:
+        reader = csv.reader(f)
+        header = next(reader, [])
+        positions = [header.index(column) for column in columns]
+        width = max(positions) + 1
+        for row in reader:
+            stats.rows[name] += 1
+            if len(row) < width:
+                stats.dropped[name] += 1
+                continue
+            yield tuple(row[position] for position in positions)
+    stats.seconds[name] += time.perf_counter() - start
+
+
+def reachable(directory, seeds, stats):
+    """
+    Return (people, movies, stars): the sets of person and movie IDs
+    connected to the `seeds` person IDs, and the (person ID, movie ID) rows
+    of stars.csv among them. stars.csv is read once into pairs of interned
+    indices, and a breadth-first search over those runs in memory.
+    """
+    person_index, movie_index = {}, {}
+    star_people = array(INDEX_TYPE)
+    star_movies = array(INDEX_TYPE)
+    for person_id, movie_id in read_rows(directory, "stars.csv", ["person_id", "movie_id"], stats):
+        star_people.append(person_index.setdefault(person_id, len(person_index)))
+        star_movies.append(movie_index.setdefault(movie_id, len(movie_index)))
+    person_ids = list(person_index)
+    movie_ids = list(movie_index)
+    person_offsets, person_movies = build_csr(len(person_ids), star_people, star_movies)
+    movie_offsets, movie_stars = build_csr(len(movie_ids), star_movies, star_people)
+
+    reached_people = bytearray(len(person_ids))
+    reached_movies = bytearray(len(movie_ids))
+    frontier = [person_index[seed] for seed in seeds if seed in person_index]
+    for person in frontier:
+        reached_people[person] = 1
+    while frontier:
+        next_frontier = []
+        for person in frontier:
+            for movie in person_movies[person_offsets[person]:person_offsets[person + 1]]:
+                if reached_movies[movie]:
+                    continue
+                reached_movies[movie] = 1
+                for star in movie_stars[movie_offsets[movie]:movie_offsets[movie + 1]]:
+                    if not reached_people[star]:
+                        reached_people[star] = 1
+                        next_frontier.append(star)
+        frontier = next_frontier
+
+    people = set(seeds) | {person_ids[person] for person in range(len(person_ids)) if reached_people[person]}
+    movies = {movie_ids[movie] for movie in range(len(movie_ids)) if reached_movies[movie]}
+    stars = [
+        (person_ids[person], movie_ids[movie])
+        for person, movie in zip(star_people, star_movies) if reached_people[person]
+    ]
+    return people, movies, stars
+
+
+def peak_memory():
+    """
+    Return the peak resident set size of this process in bytes.
+    """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def source_signature(directory):
+    """
+    Return the [mtime_ns, size, ...] of the CSV files in `directory`.
+    """
+    signature = []
+    for name in SOURCES:
+        stat = os.stat(os.path.join(directory, name))
+        signature.extend([stat.st_mtime_ns, stat.st_size])
+    return signature
+
+
+def build_csr(count, keys, values):
+    """
+    Group `values` by their `keys`, which are indices below `count`,
+    and return the (offsets, indices) arrays of the resulting CSR structure.
+    """
+    offsets = array(OFFSET_TYPE, bytes(array(OFFSET_TYPE).itemsize * (count + 1)))
+    for key in keys:
+        offsets[key + 1] += 1
+    for i in range(count):
+        offsets[i + 1] += offsets[i]
+
+    indices = array(INDEX_TYPE, bytes(array(INDEX_TYPE).itemsize * len(values)))
+    cursor = array(OFFSET_TYPE, offsets[:-1])
+    for key, value in zip(keys, values):
+        indices[cursor[key]] = value
+        cursor[key] += 1
+    return offsets, indices
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+import heapq
+import mmap
+import os
+import struct
+import sys
+from array import array
+
+from graph import INDEX_TYPE, load_graph, source_signature
+
+# Number of landmarks to index when none is given
+LANDMARKS = 16
+
+# Index file written next to the CSVs, and its format version
+INDEX_NAME = "landmarks.index"
+INDEX_MAGIC = b"LANDMARK"
+INDEX_VERSION = 1
+
+# Distances are stored one byte per person; this marks people a landmark cannot reach
+UNREACHABLE = 255
+
+HEADER = struct.Struct("<8sIII4x" + "qq" * 3)
+
+
+def main():
+    if len(sys.argv) not in [2, 3]:
+        sys.exit("Usage: python landmarks.py directory [landmarks]")
+    directory = sys.argv[1]
+    k = int(sys.argv[2]) if len(sys.argv) == 3 else LANDMARKS
+    graph = load_graph(directory)
+    index = LandmarkIndex.build(graph, k)
+    path = index.save(directory)
+    print(f"Wrote {path}: {len(index.landmarks)} landmarks over {index.size} people.")
+
+
+def load_landmarks(directory, graph, k=LANDMARKS):
+    """
+    Load the landmark index for `directory` if it is still current,
+    otherwise build one with `k` landmarks and save it.
+    """
+    index = LandmarkIndex.load(directory)
+    if index is None or index.size != len(graph.person_ids):
+        index = LandmarkIndex.build(graph, k)
+        try:
+            index.save(directory)
+        except OSError:
+            pass
+    return index
+
+
+class LandmarkIndex():
+    """
+    Breadth-first distances from a few well-connected "landmark" people to
+    everyone else: `distances[i * size + p]` is the number of degrees between
+    landmark `i` and person `p`, or UNREACHABLE.
+
+    By the triangle inequality, every landmark L bounds the distance between
+    s and t from both sides: |d(L, s) - d(L, t)| <= d(s, t) <= d(s, L) + d(L, t).
+    """
+    def __init__(self, landmarks, distances, size, buffer=None):
+        self.landmarks = landmarks
+        self.distances = distances
+        self.size = size
+
+        # Memory map backing `distances`, if loaded from disk
+        self.buffer = buffer
+
+    @classmethod
+    def build(cls, graph, k=LANDMARKS):
+        """
+        Pick the `k` people with the most co-star links as landmarks
+        and run a breadth-first search from each of them.
+        """
+        size = len(graph.person_ids)
+        degree = [
+            sum(len(graph.stars_for_movie(movie)) for movie in graph.movies_for_person(person))
+            for person in range(size)
+        ]
+        landmarks = array(INDEX_TYPE, sorted(range(size), key=degree.__getitem__, reverse=True)[:k])
+        distances = bytearray()
+        for landmark in landmarks:
+            distances += distances_from(graph, landmark)
+        return cls(landmarks, distances, size)
+
+    @classmethod
+    def load(cls, directory):
+        """
+        Memory-map the index in `directory`, or return None if it is
+        missing, stale, from another version or truncated.
+        """
+        try:
+            with open(os.path.join(directory, INDEX_NAME), "rb") as f:
+                buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, version, k, size, *signature = HEADER.unpack_from(buffer)
+            if (magic != INDEX_MAGIC or version != INDEX_VERSION or
+                    signature != source_signature(directory)):
+                return None
+        except (OSError, ValueError, struct.error):
+            return None
+        view = memoryview(buffer)
+        start = HEADER.size
+        if start + k * array(INDEX_TYPE).itemsize + k * size > len(view):
+            return None
+        landmarks = view[start:start + k * array(INDEX_TYPE).itemsize].cast(INDEX_TYPE)
+        start += k * landmarks.itemsize
+        return cls(landmarks, view[start:start + k * size], size, buffer)
+
+    def save(self, directory):
+        """
+        Write the index to `directory`, stamped with the CSVs it was built from,
+        and return its path.
+        """
+        path = os.path.join(directory, INDEX_NAME)
+        temporary = path + ".tmp"
+        with open(temporary, "wb") as f:
+            f.write(HEADER.pack(INDEX_MAGIC, INDEX_VERSION, len(self.landmarks), self.size,
+                                *source_signature(directory)))
+            f.write(memoryview(self.landmarks).cast("B"))
+            f.write(self.distances)
+        os.replace(temporary, path)
+        return path
+
+    def bounds(self, source, target):
+        """
+        Returns (at_least, at_most) degrees of separation between two people,
+        where `at_most` is None if no landmark reaches both. Returns None if
+        some landmark reaches one of them but not the other, since they are
+        then in different components and not connected at all.
+        """
+        at_least, at_most = 0, None
+        for i in range(len(self.landmarks)):
+            d_source = self.distances[i * self.size + source]
+            d_target = self.distances[i * self.size + target]
+            if d_source == UNREACHABLE and d_target == UNREACHABLE:
+                continue
+            if d_source == UNREACHABLE or d_target == UNREACHABLE:
+                return None
+            at_least = max(at_least, abs(d_source - d_target))
+            if at_most is None or d_source + d_target < at_most:
+                at_most = d_source + d_target
+        if source != target:
+            at_least = max(at_least, 1)
+        return at_least, at_most
+
+    def heuristic(self, target):
+        """
+        Returns a function giving, for any person, the landmark lower bound on
+        their degrees of separation from `target`.
+        """
+        rows = [
+            (self.distances[i * self.size:(i + 1) * self.size], self.distances[i * self.size + target])
+            for i in range(len(self.landmarks))
+        ]
+        rows = [(row, d_target) for row, d_target in rows if d_target != UNREACHABLE]
+
+        def estimate(person):
+            best = 0
+            for row, d_target in rows:
+                d = row[person]
+                if d != UNREACHABLE and abs(d - d_target) > best:
+                    best = abs(d - d_target)
+            return best
+        return estimate
+
+    def shortest_path(self, graph, source, target):
+        """
+        Returns the shortest list of (movie, person) index pairs that connect
+        the source to the target, using A* search guided by landmark bounds
+        (ALT). If no possible path, returns None.
+        """
+        if self.bounds(source, target) is None:
+            return None
+        estimate = self.heuristic(target)
+
+        # The heuristic is consistent, so people are final once popped; a movie
+        # only needs re-expanding if it is reached again at a lower cost
+        costs = {source: 0}
+        parents = {source: None}
+        movie_costs = {}
+        done = set()
+        queue = [(estimate(source), 0, source)]
+        while queue:
+            _, cost, person = heapq.heappop(queue)
+            if person in done:
+                continue
+            if person == target:
+                path = []
+                while parents[person] is not None:
+                    movie, parent = parents[person]
+                    path.append((movie, person))
+                    person = parent
+                path.reverse()
+                return path
+            done.add(person)
+            for movie in graph.movies_for_person(person):
+                if movie_costs.get(movie, cost + 1) <= cost:
+                    continue
+                movie_costs[movie] = cost
+                for star in graph.stars_for_movie(movie):
+                    if cost + 1 < costs.get(star, cost + 2):
+                        costs[star] = cost + 1
+                        parents[star] = (movie, person)
+                        heapq.heappush(queue, (cost + 1 + estimate(star), cost + 1, star))
+        return None
+
+
+def distances_from(graph, source):
+    """
+    Return a bytearray of breadth-first degrees of separation from `source`
+    to every person, capped below UNREACHABLE.
+    """
+    distances = bytearray([UNREACHABLE]) * len(graph.person_ids)
+    expanded = bytearray(len(graph.movie_ids))
+    distances[source] = 0
+    frontier = [source]
+    depth = 0
+    while frontier:
+        depth = min(depth + 1, UNREACHABLE - 1)
+        next_frontier = []
+        for person in frontier:
+            for movie in graph.movies_for_person(person):
+                if expanded[movie]:
+                    continue
+                expanded[movie] = 1
+                for star in graph.stars_for_movie(movie):
+                    if distances[star] == UNREACHABLE:
+                        distances[star] = depth
+                        next_frontier.append(star)
+        frontier = next_frontier
+    return distances
+
+
+if __name__ == "__main__":
+    main()
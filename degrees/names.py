@@ -0,0 +1,275 @@
+import mmap
+import os
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+from collections import Counter
+
+from graph import INDEX_TYPE, OFFSET_TYPE, load_graph, source_signature
+
+# Index file written next to the CSVs, and its format version
+INDEX_NAME = "names.index"
+INDEX_MAGIC = b"NAMEINDX"
+INDEX_VERSION = 1
+
+# Number of candidates returned by a search when no limit is given
+LIMIT = 10
+
+# Postings read per query before only the rarest trigrams are used,
+# and candidates re-scored exactly after counting shared trigrams
+POSTINGS_BUDGET = 20000
+RESCORED = 200
+
+# Candidates scoring below this share too little of the query to suggest
+MIN_SCORE = 0.3
+
+HEADER = struct.Struct("<8sIqqq4x" + "qq" * 3)
+
+
+def main():
+    if len(sys.argv) < 2:
+        sys.exit("Usage: python names.py directory [name]")
+    graph = load_graph(sys.argv[1])
+    index = load_names(sys.argv[1], graph)
+    if len(sys.argv) == 2:
+        print(f"Name index ready: {len(index.name_starts) - 1} distinct names.")
+        return
+    for candidate in index.search(" ".join(sys.argv[2:])):
+        print(f"ID: {candidate['person_id']}, Name: {candidate['name']}, "
+              f"Birth: {candidate['birth']}, Score: {candidate['score']:.2f}")
+
+
+def load_names(directory, graph):
+    """
+    Load the name index for `directory` if it is still current,
+    otherwise build it from `graph` and save it.
+    """
+    index = NameIndex.load(directory, graph)
+    if index is None:
+        index = NameIndex.build(graph)
+        try:
+            index.save(directory)
+        except OSError:
+            pass
+    return index
+
+
+class NameIndex():
+    """
+    Prefix and trigram index over the people of a StarGraph.
+
+    The graph's `name_order` already lists people sorted by lower-cased name,
+    so equal names are adjacent and prefixes are contiguous ranges. Each
+    distinct name `i` spans `name_order[name_starts[i]:name_starts[i + 1]]`,
+    and the trigram with code `keys[j]` occurs in the distinct names
+    `postings[offsets[j]:offsets[j + 1]]`.
+    """
+    def __init__(self, graph, name_starts, keys, offsets, postings, buffer=None):
+        self.graph = graph
+        self.name_starts = name_starts
+        self.keys = keys
+        self.offsets = offsets
+        self.postings = postings
+
+        # Memory map backing the arrays, if loaded from disk
+        self.buffer = buffer
+
+    @classmethod
+    def build(cls, graph):
+        """
+        Group the graph's people into distinct names and index their trigrams.
+        """
+        name_starts = array(INDEX_TYPE)
+        postings_by_key = {}
+        previous = None
+        for position, person in enumerate(graph.name_order):
+            name = graph.person_names[person].lower()
+            if name == previous:
+                continue
+            previous = name
+            for trigram in trigrams(normalize(name)):
+                postings_by_key.setdefault(trigram_code(trigram), array(INDEX_TYPE)).append(len(name_starts))
+            name_starts.append(position)
+        name_starts.append(len(graph.name_order))
+
+        keys = array(OFFSET_TYPE, sorted(postings_by_key))
+        offsets = array(OFFSET_TYPE, [0])
+        postings = array(INDEX_TYPE)
+        for key in keys:
+            postings.extend(postings_by_key[key])
+            offsets.append(len(postings))
+        return cls(graph, name_starts, keys, offsets, postings)
+
+    @classmethod
+    def load(cls, directory, graph):
+        """
+        Memory-map the index in `directory` for `graph`, or return None if
+        it is missing, stale, from another version, truncated, or built
+        for a graph with other people.
+        """
+        try:
+            with open(os.path.join(directory, INDEX_NAME), "rb") as f:
+                buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, version, names, key_count, posting_count, *signature = HEADER.unpack_from(buffer)
+            if (magic != INDEX_MAGIC or version != INDEX_VERSION or
+                    signature != source_signature(directory)):
+                return None
+        except (OSError, ValueError, struct.error):
+            return None
+
+        # A truncated file would otherwise yield short sections, so check the
+        # counts in the header against its size and the graph before casting
+        view = memoryview(buffer)
+        sections = []
+        start = HEADER.size
+        for typecode, count in [(INDEX_TYPE, names + 1), (OFFSET_TYPE, key_count),
+                                (OFFSET_TYPE, key_count + 1), (INDEX_TYPE, posting_count)]:
+            start += -start % 8
+            length = count * array(typecode).itemsize
+            if count < 0 or start + length > len(view):
+                return None
+            sections.append(view[start:start + length].cast(typecode))
+            start += length
+        name_starts, keys, offsets, postings = sections
+        if (names > len(graph.person_ids) or name_starts[-1] != len(graph.name_order) or
+                offsets[-1] != posting_count):
+            return None
+        return cls(graph, *sections, buffer)
+
+    def save(self, directory):
+        """
+        Write the index to `directory`, stamped with the CSVs it was built from,
+        and return its path.
+        """
+        path = os.path.join(directory, INDEX_NAME)
+        temporary = path + ".tmp"
+        with open(temporary, "wb") as f:
+            f.write(HEADER.pack(INDEX_MAGIC, INDEX_VERSION, len(self.name_starts) - 1,
+                                len(self.keys), len(self.postings), *source_signature(directory)))
+            for section in [self.name_starts, self.keys, self.offsets, self.postings]:
+                f.write(bytes(-f.tell() % 8))
+                f.write(memoryview(section).cast("B"))
+        os.replace(temporary, path)
+        return path
+
+    def prefix(self, text, limit=LIMIT):
+        """
+        Returns up to `limit` person indices whose name starts with `text`,
+        ignoring case, in name order.
+        """
+        text = text.lower()
+        start = bisect_left(self.graph.name_order, text, key=self.sort_key)
+        people = []
+        for person in self.graph.name_order[start:start + limit]:
+            if not self.sort_key(person).startswith(text):
+                break
+            people.append(person)
+        return people
+
+    def search(self, query, limit=LIMIT):
+        """
+        Returns up to `limit` candidates for a possibly misspelled name, best
+        first, as dicts of person_id, name, birth and a score between 0 and 1:
+        exact matches score 1, then names are ranked by trigram similarity,
+        leaving out those scoring below MIN_SCORE.
+        """
+        query = normalize(query)
+        query_trigrams = trigrams(query)
+
+        # Count shared trigrams per distinct name, rarest trigrams first,
+        # then re-score the most promising names exactly
+        lists = []
+        for trigram in query_trigrams:
+            code = trigram_code(trigram)
+            j = bisect_left(self.keys, code)
+            if j < len(self.keys) and self.keys[j] == code:
+                lists.append(self.postings[self.offsets[j]:self.offsets[j + 1]])
+        lists.sort(key=len)
+        shared = Counter()
+        read = 0
+        for postings in lists:
+            if read and read + len(postings) > POSTINGS_BUDGET:
+                break
+            shared.update(postings)
+            read += len(postings)
+
+        # Exact matches are always scored, however common their trigrams
+        scored = []
+        exact = self.exact(query)
+        if exact is not None:
+            scored.append((1.0, exact))
+            shared.pop(exact, None)
+        for name, _ in shared.most_common(RESCORED):
+            text = self.sort_key(self.graph.name_order[self.name_starts[name]])
+            score = similarity(query_trigrams, trigrams(normalize(text)))
+            if score >= MIN_SCORE:
+                scored.append((score, name))
+        scored.sort(key=lambda item: -item[0])
+
+        candidates = []
+        for score, name in scored:
+            for position in range(self.name_starts[name], self.name_starts[name + 1]):
+                person = self.graph.name_order[position]
+                candidates.append({
+                    "person_id": self.graph.person_ids[person],
+                    "name": self.graph.person_names[person],
+                    "birth": self.graph.person_births[person],
+                    "score": score,
+                })
+                if len(candidates) == limit:
+                    return candidates
+        return candidates
+
+    def exact(self, name):
+        """
+        Returns the distinct name number for `name`, ignoring case, or None.
+        """
+        name = name.lower()
+        start = bisect_left(self.graph.name_order, name, key=self.sort_key)
+        if start == len(self.graph.name_order) or self.sort_key(self.graph.name_order[start]) != name:
+            return None
+        return bisect_left(self.name_starts, start)
+
+    def sort_key(self, person):
+        """
+        Returns the lower-cased name that `name_order` is sorted by.
+        """
+        return self.graph.person_names[person].lower()
+
+
+def normalize(name):
+    """
+    Lower-case a name and collapse runs of whitespace.
+    """
+    return " ".join(name.lower().split())
+
+
+def trigrams(name):
+    """
+    Return the set of three-character substrings of a normalized name,
+    padded so that word starts and ends count as well.
+    """
+    padded = f"  {name} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def trigram_code(trigram):
+    """
+    Pack a trigram into one integer, 21 bits per code point.
+    """
+    a, b, c = (ord(character) for character in trigram)
+    return (a << 42) | (b << 21) | c
+
+
+def similarity(a, b):
+    """
+    Jaccard similarity of two trigram sets.
+    """
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+import asyncio
+import json
+import multiprocessing
+import os
+import sys
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import parse_qs, urlsplit
+
+import batch
+from graph import load_graph
+from names import load_names
+
+# Address to listen on when only a port (or nothing) is given
+HOST = "127.0.0.1"
+PORT = 8050
+
+# Number of recent (source, target) results kept in memory
+CACHE_SIZE = 4096
+
+# Longest request line or header accepted, in bytes
+LINE_LIMIT = 8192
+
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           500: "Internal Server Error"}
+
+
+def main():
+    if len(sys.argv) not in [2, 3, 4]:
+        sys.exit("Usage: python server.py directory [port|socket] [workers]")
+    directory = sys.argv[1]
+    address = sys.argv[2] if len(sys.argv) >= 3 else str(PORT)
+    workers = int(sys.argv[3]) if len(sys.argv) == 4 else os.cpu_count()
+
+    print("Loading data...")
+    server = DegreesServer(directory, workers)
+    print("Data loaded.")
+    try:
+        asyncio.run(server.serve(address))
+    except KeyboardInterrupt:
+        pass
+
+
+class DegreesServer():
+    """
+    Answers degrees queries over HTTP from one graph loaded at startup.
+
+        GET /path?source=...&target=...   names or IDs, as in batch.py
+        GET /names?q=...[&limit=...]      fuzzy name candidates
+
+    Searches run in a bounded pool of worker processes forked after loading,
+    so they share the memory-mapped graph, and recent answers are cached.
+    """
+    def __init__(self, directory, workers):
+        batch.graph = load_graph(directory)
+        batch.name_index = load_names(directory, batch.graph)
+        self.workers = workers
+        self.cache = OrderedDict()
+        self.pending = {}
+        self.pool = None
+
+    async def serve(self, address):
+        """
+        Listen on a TCP port, or on a Unix socket path, until cancelled.
+        """
+        context = multiprocessing.get_context("fork")
+        with ProcessPoolExecutor(self.workers, mp_context=context) as self.pool:
+            if address.isdigit():
+                server = await asyncio.start_server(self.handle, HOST, int(address), limit=LINE_LIMIT)
+                print(f"Listening on http://{HOST}:{address}")
+            else:
+                server = await asyncio.start_unix_server(self.handle, address, limit=LINE_LIMIT)
+                print(f"Listening on {address}")
+            async with server:
+                await server.serve_forever()
+
+    async def handle(self, reader, writer):
+        """
+        Read one HTTP request from the connection and write its JSON response.
+        """
+        request = []
+        try:
+            request = (await reader.readline()).decode("latin-1").split()
+            while (await reader.readline()) not in [b"\r\n", b"\n", b""]:
+                pass
+            if len(request) != 3:
+                status, body = 400, {"error": "malformed request"}
+            elif request[0] != "GET":
+                status, body = 405, {"error": "only GET is supported"}
+            else:
+                status, body = await self.route(request[1])
+        except (ValueError, asyncio.LimitOverrunError):
+            status, body = 400, {"error": "malformed request"}
+        except Exception as e:
+            # Such as BrokenProcessPool if a worker died; answer rather than drop the connection
+            print(f"Error handling {' '.join(request)}: {e!r}", file=sys.stderr)
+            status, body = 500, {"error": "internal error"}
+
+        payload = json.dumps(body).encode("utf-8")
+        writer.write(
+            f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(payload)}\r\n"
+            f"Connection: close\r\n\r\n".encode("latin-1") + payload
+        )
+        try:
+            await writer.drain()
+            writer.close()
+            await writer.wait_closed()
+        except ConnectionError:
+            pass
+
+    async def route(self, target):
+        """
+        Return the (status, body) for a request target.
+        """
+        url = urlsplit(target)
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        if url.path == "/path":
+            if "source" not in query or "target" not in query:
+                return 400, {"error": "source and target are required"}
+            return await self.path(query["source"], query["target"])
+        elif url.path == "/names":
+            if "q" not in query:
+                return 400, {"error": "q is required"}
+            return 200, batch.name_index.search(query["q"], int(query.get("limit", 10)))
+        return 404, {"error": f"unknown path: {url.path}"}
+
+    async def path(self, source_value, target_value):
+        """
+        Return (status, body) with the batch-style result for one pair of
+        names or IDs, from the cache if possible and otherwise from a worker
+        process. Concurrent requests for the same pair share one search.
+        A person who cannot be found is a 404, an ambiguous name a 400.
+        """
+        source, source_error = batch.resolve_person(source_value)
+        target, target_error = batch.resolve_person(target_value)
+        for value, error in [(source_value, source_error), (target_value, target_error)]:
+            if error:
+                status = 400 if len(batch.graph.people_for_name(value)) > 1 else 404
+                return status, {"error": error}
+
+        key = (source, target)
+        if key in self.cache:
+            self.cache.move_to_end(key)
+            return 200, self.cache[key]
+        if key not in self.pending:
+            loop = asyncio.get_running_loop()
+            self.pending[key] = loop.run_in_executor(self.pool, search, source, target)
+        try:
+            result = await asyncio.shield(self.pending[key])
+        finally:
+            self.pending.pop(key, None)
+
+        self.cache[key] = result
+        if len(self.cache) > CACHE_SIZE:
+            self.cache.popitem(last=False)
+        return 200, result
+
+
+def search(source, target):
+    """
+    Find the shortest path between two person indices in a worker process.
+    """
+    return batch.path_result(source, target, batch.graph.shortest_path(source, target))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,6 @@
+from collections import Counter, deque
+
+
 class Node():
     def __init__(self, state, parent, action):
         self.state = state
@@ -36,3 +39,72 @@ class QueueFrontier(StackFrontier):
             node = self.frontier[0]
             self.frontier = self.frontier[1:]
             return node
+
+
+class DequeStackFrontier():
+    """
+    StackFrontier backed by a deque, with a count of the states
+    it holds so that add, remove and contains_state are all O(1).
+
+    A drop-in for Node-based searches in the style of the lectures; the
+    degrees searches themselves use a plain deque and a parents dict, so
+    these frontiers are only exercised by benchmark.py.
+    """
+    def __init__(self):
+        self.frontier = deque()
+        self.states = Counter()
+
+    def add(self, node):
+        self.frontier.append(node)
+        self.states[node.state] += 1
+
+    def contains_state(self, state):
+        return self.states[state] > 0
+
+    def empty(self):
+        return len(self.frontier) == 0
+
+    def remove(self):
+        if self.empty():
+            raise Exception("empty frontier")
+        else:
+            node = self.frontier.pop()
+            self.discard_state(node.state)
+            return node
+
+    def discard_state(self, state):
+        self.states[state] -= 1
+        if self.states[state] == 0:
+            del self.states[state]
+
+
+class DequeQueueFrontier(DequeStackFrontier):
+
+    def remove(self):
+        if self.empty():
+            raise Exception("empty frontier")
+        else:
+            node = self.frontier.popleft()
+            self.discard_state(node.state)
+            return node
+
+
+def join_paths(meeting, forward, backward):
+    """
+    Returns the (movie, person) path through `meeting`
+    from the parent pointers of a bidirectional search.
+    """
+    path = []
+    person_id = meeting
+    while forward[person_id] is not None:
+        movie_id, parent_id = forward[person_id]
+        path.append((movie_id, person_id))
+        person_id = parent_id
+    path.reverse()
+
+    person_id = meeting
+    while backward[person_id] is not None:
+        movie_id, child_id = backward[person_id]
+        path.append((movie_id, child_id))
+        person_id = child_id
+    return path
@@ -0,0 +1,224 @@
+import csv
+import glob
+import hashlib
+import json
+import multiprocessing
+import os
+import signal
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+from heredity import PROBS, parse_data
+from junction import junction_probabilities
+
+# Marginals of families already scored, one JSON line per content hash,
+# written to the working directory
+CACHE_NAME = "marginals.cache"
+
+# Format version of cache entries, hashed with the model and file contents
+CACHE_VERSION = 1
+
+# Seconds a single family may take before it is abandoned
+TIMEOUT = 60
+
+# Families whose junction tree is wider than this are rejected before any
+# table is built: the largest clique then holds 3 ** 15 floats (110 MiB)
+MAX_WIDTH = 14
+
+# Output formats
+FORMATS = ["jsonl", "csv"]
+
+# Columns of the CSV output: one row per person, or per family that failed
+CSV_FIELDS = ["file", "person", "gene0", "gene1", "gene2", "trait", "error"]
+
+
+def main():
+    if len(sys.argv) not in [2, 3, 4, 5] or (len(sys.argv) > 2 and sys.argv[2] not in FORMATS):
+        sys.exit("Usage: python batch.py (directory|pattern) [jsonl|csv] [timeout] [processes]")
+    output = sys.argv[2] if len(sys.argv) > 2 else "jsonl"
+    timeout = float(sys.argv[3]) if len(sys.argv) > 3 else TIMEOUT
+    processes = int(sys.argv[4]) if len(sys.argv) > 4 else os.cpu_count()
+    paths = family_files(sys.argv[1])
+    if not paths:
+        sys.exit(f"No pedigree CSVs match {sys.argv[1]}")
+
+    start = time.perf_counter()
+    cache = load_cache(CACHE_NAME)
+    writer = None
+    if output == "csv":
+        writer = csv.writer(sys.stdout)
+        writer.writerow(CSV_FIELDS)
+    scored = cached = failed = 0
+    with open(CACHE_NAME, "a", encoding="utf-8") as cache_file:
+        for result in score_families(paths, cache, timeout, processes):
+            if "error" in result:
+                failed += 1
+            elif result["cached"]:
+                cached += 1
+            else:
+                scored += 1
+                if result["hash"] not in cache:
+                    cache[result["hash"]] = result["people"]
+                    cache_file.write(json.dumps({"hash": result["hash"], "people": result["people"]}) + "\n")
+                    cache_file.flush()
+            if writer is None:
+                print(json.dumps(result))
+            else:
+                writer.writerows(csv_rows(result))
+            sys.stdout.flush()
+    print(f"{len(paths)} families: {scored} scored, {cached} unchanged and cached, {failed} failed "
+          f"in {time.perf_counter() - start:.2f}s", file=sys.stderr)
+
+
+def family_files(pattern):
+    """
+    Return the sorted list of pedigree CSVs in a directory, or matching a glob pattern.
+    """
+    if os.path.isdir(pattern):
+        pattern = os.path.join(pattern, "*.csv")
+    return sorted(path for path in glob.glob(pattern) if os.path.isfile(path))
+
+
+def content_hash(data):
+    """
+    Return the hex SHA-256 of a family file's bytes, together with the
+    cache version and the model in PROBS, so that changing either one
+    invalidates every cached result.
+    """
+    digest = hashlib.sha256(f"{CACHE_VERSION}\n{json.dumps(PROBS, sort_keys=True)}\n".encode("utf-8"))
+    digest.update(data)
+    return digest.hexdigest()
+
+
+def load_cache(path):
+    """
+    Return a dictionary of content hash -> marginals from the cache file at
+    `path`, skipping lines that do not parse, such as one cut short when
+    an earlier run was interrupted.
+    """
+    cache = {}
+    try:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                    cache[entry["hash"]] = entry["people"]
+                except (ValueError, KeyError, TypeError):
+                    continue
+    except FileNotFoundError:
+        pass
+    return cache
+
+
+def score_families(paths, cache, timeout, processes):
+    """
+    Yield one result per family file as soon as it is known: cached ones
+    first, as the files are read and hashed, then the rest scored by
+    `processes` forked workers, in the order they finish.
+    """
+    jobs = []
+    for path in paths:
+        with open(path, "rb") as f:
+            data = f.read()
+        digest = content_hash(data)
+        if digest in cache:
+            yield {"file": path, "hash": digest, "cached": True, "people": cache[digest]}
+        else:
+            jobs.append((path, digest, data, timeout))
+
+    if processes <= 1 or len(jobs) <= 1:
+        for job in jobs:
+            yield score_family(job)
+        return
+
+    # A worker killed outright, say by the out-of-memory killer, breaks the
+    # pool; every family it had not finished is reported instead of waited on
+    context = multiprocessing.get_context("fork")
+    with ProcessPoolExecutor(processes, mp_context=context) as pool:
+        futures = {}
+        for job in jobs:
+            try:
+                futures[pool.submit(score_family, job)] = job
+            except BrokenProcessPool:
+                yield died(job)
+        for future in as_completed(futures):
+            try:
+                yield future.result()
+            except BrokenProcessPool:
+                yield died(futures[future])
+
+
+def score_family(job):
+    """
+    Return the result for one (path, hash, file contents, timeout) job:
+    each person's exact marginals from the junction tree, or an error if
+    the file does not parse, the tree is wider than MAX_WIDTH, or scoring
+    takes longer than the timeout. The timeout is an interval timer, so
+    it interrupts the Python loops of the junction tree, but not a single
+    long NumPy operation; MAX_WIDTH bounds how long and large those get.
+    """
+    path, digest, data, timeout = job
+    result = {"file": path, "hash": digest, "cached": False}
+    previous = signal.signal(signal.SIGALRM, time_out)
+    try:
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+        try:
+            people = parse_data(data.decode("utf-8").splitlines())
+            result["people"] = marginals(junction_probabilities(people, MAX_WIDTH))
+        finally:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+    except TimeoutError:
+        result["error"] = f"timed out after {timeout:g}s"
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+    finally:
+        signal.signal(signal.SIGALRM, previous)
+    return result
+
+
+def died(job):
+    """
+    Return the error result for a job lost with a broken worker pool.
+    """
+    path, digest, data, timeout = job
+    return {"file": path, "hash": digest, "cached": False, "error": "worker process died"}
+
+
+def time_out(signum, frame):
+    """
+    Signal handler that abandons the family being scored.
+    """
+    raise TimeoutError
+
+
+def marginals(probabilities):
+    """
+    Return `junction_probabilities` in JSON-ready form: for each person,
+    their gene distribution as a list indexed by gene count, and the
+    probability that they have the trait.
+    """
+    return {
+        person: {
+            "gene": [probabilities[person]["gene"][gene] for gene in range(3)],
+            "trait": probabilities[person]["trait"][True],
+        }
+        for person in probabilities
+    }
+
+
+def csv_rows(result):
+    """
+    Return the CSV_FIELDS rows of one family's result.
+    """
+    if "error" in result:
+        return [[result["file"], "", "", "", "", "", result["error"]]]
+    return [
+        [result["file"], person, *marginal["gene"], marginal["trait"], ""]
+        for person, marginal in result["people"].items()
+    ]
+
+
+if __name__ == "__main__":
+    main()
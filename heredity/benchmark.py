@@ -0,0 +1,130 @@
+import random
+import sys
+import time
+
+from heredity import enumerate_probabilities, load_data, powerset_probabilities
+from junction import junction_probabilities
+from sampling import METHODS, sample_probabilities
+from vectorized import vectorized_probabilities
+
+# Bundled families benchmarked when none are given
+FAMILIES = ["data/family0.csv", "data/family1.csv", "data/family2.csv"]
+
+# Synthetic pedigree sizes added to the bundled families
+SIZES = [6, 8, 10, 12, 14]
+
+# The powerset loops take minutes beyond this many people, so they are skipped
+POWERSET_LIMIT = 8
+
+# Synthetic pedigree sizes sampled, too large for anything but the junction tree
+SAMPLING_SIZES = [50, 200]
+
+# Enumeration is exponential too, and skipped beyond this many people
+ENUMERATION_LIMIT = 14
+
+# Batches of 3^n assignments are skipped beyond this many people
+VECTORIZED_LIMIT = 16
+
+
+def main():
+    if len(sys.argv) < 2 or sys.argv[1] not in COMMANDS:
+        sys.exit(f"Usage: python benchmark.py ({'|'.join(COMMANDS)}) [args...]")
+    COMMANDS[sys.argv[1]](sys.argv[2:])
+
+
+def enumeration(args):
+    """
+    Time the powerset loops of the original `main` against lazy bitmask
+    enumeration, batched NumPy evaluation and the junction tree on each family in `args`: a CSV
+    file, or a number of people for a synthetic pedigree. All methods
+    are checked to agree.
+    """
+    for name, people in load_families(args or FAMILIES + [str(size) for size in SIZES]):
+        print(f"{name} ({len(people)} people)")
+        methods = [
+            ("powerset_probabilities", powerset_probabilities, POWERSET_LIMIT),
+            ("enumerate_probabilities", enumerate_probabilities, ENUMERATION_LIMIT),
+            ("vectorized_probabilities", vectorized_probabilities, VECTORIZED_LIMIT),
+            ("junction_probabilities", junction_probabilities, None),
+        ]
+        results = []
+        for method, solve, limit in methods:
+            if limit is not None and len(people) > limit:
+                print(f"  {method:24} skipped (more than {limit} people)")
+                continue
+            start = time.perf_counter()
+            results.append(solve(people))
+            print(f"  {method:24} {time.perf_counter() - start:10.4f}s")
+        error = max(
+            abs(result[person][field][value] - results[0][person][field][value])
+            for result in results for person in people
+            for field in result[person] for value in result[person][field]
+        )
+        print(f"  largest difference between methods: {error:.1e}")
+
+
+def sampling(args):
+    """
+    Time each `sample_probabilities` method on each family in `args`, as
+    for `enumeration`, and compare it with the exact junction tree: the
+    largest error, and the share of values whose confidence interval
+    covers the exact value.
+    """
+    for name, people in load_families(args or FAMILIES + [str(size) for size in SAMPLING_SIZES]):
+        print(f"{name} ({len(people)} people)")
+        exact = junction_probabilities(people)
+        for method in METHODS:
+            start = time.perf_counter()
+            probabilities, intervals = sample_probabilities(people, method, seed=0)
+            elapsed = time.perf_counter() - start
+            errors = [
+                (abs(probabilities[person]["gene"][gene] - exact[person]["gene"][gene]),
+                 intervals[person]["gene"][gene])
+                for person in people for gene in exact[person]["gene"]
+            ]
+            error = max(error for error, width in errors)
+            covered = sum(error <= width for error, width in errors) / len(errors)
+            print(f"  {method:10} {elapsed:10.4f}s  largest error {error:.4f}  covered {covered:.0%}")
+
+
+def load_families(args):
+    """
+    Yield (name, people) for each argument: a CSV file to load, or a
+    number of people for a synthetic pedigree.
+    """
+    for arg in args:
+        if arg.isdigit():
+            yield f"synthetic {arg}", synthetic_pedigree(int(arg))
+        else:
+            yield arg, load_data(arg)
+
+
+def synthetic_pedigree(n, seed=0, known=0.5, founders=2, window=12):
+    """
+    Return a `load_data`-style pedigree of `n` people over several
+    generations: after the first `founders`, each person's parents are
+    drawn from the `window` people before them, and each trait is known
+    with probability `known`.
+    """
+    rng = random.Random(seed)
+    people = dict()
+    names = []
+    for i in range(n):
+        name = f"Person{i}"
+        mother = father = None
+        if i >= founders:
+            mother, father = rng.sample(names[-window:], 2)
+        trait = rng.choice([True, False]) if rng.random() < known else None
+        people[name] = {"name": name, "mother": mother, "father": father, "trait": trait}
+        names.append(name)
+    return people
+
+
+COMMANDS = {
+    "enumeration": enumeration,
+    "sampling": sampling,
+}
+
+
+if __name__ == "__main__":
+    main()
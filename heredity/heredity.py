@@ -44,6 +44,31 @@ def main():
         sys.exit("Usage: python heredity.py data.csv")
     people = load_data(sys.argv[1])
 
+    # Sum the joint probability of every assignment consistent with the evidence
+    probabilities = enumerate_probabilities(people)
+
+    # Print results
+    print_probabilities(probabilities)
+
+
+def print_probabilities(probabilities):
+    """
+    Print each person's gene and trait distributions.
+    """
+    for person in probabilities:
+        print(f"{person}:")
+        for field in probabilities[person]:
+            print(f"  {field.capitalize()}:")
+            for value in probabilities[person][field]:
+                p = probabilities[person][field][value]
+                print(f"    {value}: {p:.4f}")
+
+
+def powerset_probabilities(people):
+    """
+    Return each person's normalized gene and trait distributions by looping
+    over every subset of people with the trait, one gene and two genes.
+    """
     # Keep track of gene and trait probabilities for each person
     probabilities = {
         person: {
@@ -83,15 +108,132 @@ def main():
 
     # Ensure probabilities sum to 1
     normalize(probabilities)
+    return probabilities
 
-    # Print results
+
+def enumerate_probabilities(people):
+    """
+    Return the same distributions as `powerset_probabilities`, enumerating
+    gene assignments lazily, one person at a time with parents first.
+
+    Assignments are bitmask states (`one`, `two`) of the people placed so
+    far, and each person's probability given their parents' genes, times
+    the probability of their trait if it is known, is looked up in a table
+    built once, so known traits are fixed rather than enumerated and a
+    branch with zero probability is never expanded. Unknown traits are not
+    enumerated either: each depends only on that person's genes, so their
+    distribution follows from the gene distribution.
+    """
+    order = parents_first(people)
+    position = {person: i for i, person in enumerate(order)}
+    tables = [person_table(people, person) for person in order]
+    parents = [
+        [position.get(people[person][parent]) for parent in ("mother", "father")]
+        for person in order
+    ]
+    genes = [[0, 0, 0] for person in order]
+
+    def expand(depth, one, two, prefix):
+        """
+        Add to `genes` every completion of the assignment of the first
+        `depth` people, whose probability is `prefix`, and return the sum
+        of the probabilities of the remaining people over all completions.
+        """
+        if depth == len(order):
+            return 1
+        offset = 0
+        for parent, scale in zip(parents[depth], (3, 1)):
+            if parent is not None:
+                offset += ((one >> parent & 1) | (two >> parent & 1) << 1) * scale
+        total = 0
+        for gene in range(3):
+            p = tables[depth][gene * 9 + offset]
+            if p == 0:
+                continue
+            rest = expand(depth + 1, one | (gene == 1) << depth, two | (gene == 2) << depth, prefix * p)
+            genes[depth][gene] += prefix * p * rest
+            total += p * rest
+        return total
+
+    expand(0, 0, 0, 1)
+
+    probabilities = dict()
     for person in people:
-        print(f"{person}:")
-        for field in probabilities[person]:
-            print(f"  {field.capitalize()}:")
-            for value in probabilities[person][field]:
-                p = probabilities[person][field][value]
-                print(f"    {value}: {p:.4f}")
+        counts = genes[position[person]]
+        total = sum(counts)
+        trait = people[person]["trait"]
+        if trait is None:
+            p = sum(counts[gene] * PROBS["trait"][gene][True] for gene in range(3)) / total
+        else:
+            p = 1 if trait else 0
+        probabilities[person] = {
+            "gene": {gene: counts[gene] / total for gene in PROBS["gene"]},
+            "trait": {True: p, False: 1 - p}
+        }
+    return probabilities
+
+
+def parents_first(people):
+    """
+    Return the names in `people` ordered so that parents come before
+    their children, keeping the file order otherwise.
+    """
+    order = []
+    state = dict()
+
+    def visit(person):
+        if state.get(person) == "done":
+            return
+        if state.get(person) == "visiting":
+            raise ValueError(f"{person} is their own ancestor")
+        state[person] = "visiting"
+        for parent in (people[person]["mother"], people[person]["father"]):
+            if parent in people:
+                visit(parent)
+        state[person] = "done"
+        order.append(person)
+
+    for person in people:
+        visit(person)
+    return order
+
+
+def person_table(people, person):
+    """
+    Return a flat list of the probability of each gene count of `person`
+    given their parents', times the probability of their trait if known,
+    where entry [gene * 9 + mother gene * 3 + father gene] holds the
+    probability for those counts (parents outside `people` count as 0).
+    """
+    mother, father = people[person]["mother"], people[person]["father"]
+    trait = people[person]["trait"]
+    table = []
+    for gene in range(3):
+        for mother_gene in range(3):
+            for father_gene in range(3):
+                if not mother and not father:
+                    p = PROBS["gene"][gene]
+                else:
+                    mother_prob = passing_prob(people, mother, mother_gene)
+                    father_prob = passing_prob(people, father, father_gene)
+                    if gene == 0:
+                        p = (1 - mother_prob) * (1 - father_prob)
+                    elif gene == 2:
+                        p = mother_prob * father_prob
+                    else:
+                        p = mother_prob * (1 - father_prob) + (1 - mother_prob) * father_prob
+                if trait is not None:
+                    p *= PROBS["trait"][gene][trait]
+                table.append(p)
+    return table
+
+
+def passing_prob(people, parent, genes):
+    """
+    Return the probability that `parent`, with `genes` copies of the gene,
+    passes one on, as `inherit_prob` does for sets of people.
+    """
+    return inherit_prob(people, parent, {parent} if genes == 1 else set(), {parent} if genes == 2 else set())
 
 
 def load_data(filename):
@@ -101,18 +243,25 @@ def load_data(filename):
     mother, father must both be blank, or both be valid names in the CSV.
     trait should be 0 or 1 if trait is known, blank otherwise.
     """
-    data = dict()
     with open(filename) as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            name = row["name"]
-            data[name] = {
-                "name": name,
-                "mother": row["mother"] or None,
-                "father": row["father"] or None,
-                "trait": (True if row["trait"] == "1" else
-                          False if row["trait"] == "0" else None)
-            }
+        return parse_data(f)
+
+
+def parse_data(lines):
+    """
+    Return the same dictionary as `load_data` for an iterable of CSV lines.
+    """
+    data = dict()
+    reader = csv.DictReader(lines)
+    for row in reader:
+        name = row["name"]
+        data[name] = {
+            "name": name,
+            "mother": row["mother"] or None,
+            "father": row["father"] or None,
+            "trait": (True if row["trait"] == "1" else
+                      False if row["trait"] == "0" else None)
+        }
     return data
 
 
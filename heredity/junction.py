@@ -0,0 +1,253 @@
+import sys
+
+import numpy as np
+
+from heredity import PROBS, load_data, print_probabilities
+
+# Gene counts in the order used along every factor axis
+GENES = [0, 1, 2]
+
+
+def main():
+    if len(sys.argv) != 2:
+        sys.exit("Usage: python junction.py data.csv")
+    people = load_data(sys.argv[1])
+    print_probabilities(junction_probabilities(people))
+
+
+class Factor():
+    """
+    Non-negative table over the gene counts of `variables`, one axis per
+    variable in that order, each indexed by GENES.
+    """
+    def __init__(self, variables, table):
+        self.variables = tuple(variables)
+        self.table = np.asarray(table, dtype=float)
+
+    def expand(self, variables):
+        """
+        Return the table with its axes reordered and padded with length-1
+        axes to line up with `variables`, a superset, for broadcasting.
+        """
+        order = sorted(range(len(self.variables)), key=lambda axis: variables.index(self.variables[axis]))
+        table = self.table.transpose(order)
+        shape = [len(GENES) if variable in self.variables else 1 for variable in variables]
+        return table.reshape(shape)
+
+
+def product(variables, factors):
+    """
+    Return the Factor over `variables` that is the product of `factors`,
+    whose variables must all be among `variables`.
+    """
+    table = np.ones([len(GENES)] * len(variables))
+    for factor in factors:
+        table = table * factor.expand(variables)
+    return Factor(variables, table)
+
+
+def marginalize(factor, variables):
+    """
+    Return `factor` summed down to `variables`, scaled to sum to 1, since
+    only ratios matter and long products of probabilities would underflow.
+    """
+    variables = tuple(variable for variable in factor.variables if variable in variables)
+    axes = tuple(axis for axis, variable in enumerate(factor.variables) if variable not in variables)
+    table = factor.table.sum(axis=axes)
+    return Factor(variables, table / table.sum())
+
+
+def inheritance_table(people, person):
+    """
+    Return (parents, table) for `person`: the parents that are in `people`
+    and the probability of each gene count given theirs, as an array
+    indexed [gene, parent gene, ...]. A parent outside `people` passes the
+    gene with its unconditional probability, as in `inherit_prob`.
+    """
+    mutation = PROBS["mutation"]
+    passing = np.array([mutation, 0.5, 1 - mutation])
+    unknown = PROBS["gene"][2] * (1 - mutation) + PROBS["gene"][1] * 0.5 + PROBS["gene"][0] * mutation
+    mother, father = people[person]["mother"], people[person]["father"]
+    if not mother and not father:
+        return [], np.array([PROBS["gene"][gene] for gene in GENES])
+
+    parents = [parent for parent in (mother, father) if parent in people]
+    passes = [passing if parent in people else np.array([unknown]) for parent in (mother, father)]
+    m = passes[0][:, None]
+    f = passes[1][None, :]
+    table = np.stack([(1 - m) * (1 - f), m * (1 - f) + (1 - m) * f, m * f])
+    return parents, table.reshape([len(GENES)] + [len(GENES)] * len(parents))
+
+
+def pedigree_factors(people):
+    """
+    Return the list of Factors of the pedigree from `load_data`: for each
+    person, the probability of their gene count given their parents',
+    times the probability of their trait if it is known.
+    """
+    factors = []
+    for person in people:
+        parents, table = inheritance_table(people, person)
+        trait = people[person]["trait"]
+        if trait is not None:
+            likelihood = np.array([PROBS["trait"][gene][trait] for gene in GENES])
+            table = table * likelihood.reshape([len(GENES)] + [1] * len(parents))
+        factors.append(Factor([person] + parents, table))
+    return factors
+
+
+class JunctionTree():
+    """
+    Junction tree of a list of Factors, built from a greedy min-fill
+    elimination order: eliminating each variable forms a clique of it and
+    its remaining neighbours, linked to the clique of the first of those
+    neighbours to be eliminated later. Each factor is multiplied into the
+    clique of its first eliminated variable.
+
+    `calibrate` passes messages up and back down the tree, after which
+    every variable's marginal is read from its own clique, so all of them
+    cost two passes whose size grows with the treewidth, not the number
+    of variables. An `eliminate` result may be passed in to skip redoing it.
+    """
+    def __init__(self, factors, elimination=None):
+        self.order, self.cliques = elimination or eliminate(factors)
+        position = {variable: i for i, variable in enumerate(self.order)}
+        self.position = position
+
+        # Each clique's parent is the clique of its separator's first eliminated variable
+        self.parent = [
+            min((position[variable] for variable in clique[1:]), default=None)
+            for clique in self.cliques
+        ]
+        assigned = [[] for clique in self.cliques]
+        for factor in factors:
+            assigned[min(position[variable] for variable in factor.variables)].append(factor)
+        self.potentials = [product(clique, assigned[i]) for i, clique in enumerate(self.cliques)]
+        self.beliefs = None
+
+    def calibrate(self):
+        """
+        Pass messages from the leaves to the roots and back, and store every
+        clique's belief (its potential times all incoming messages).
+        """
+        children = [[] for clique in self.cliques]
+        for i, parent in enumerate(self.parent):
+            if parent is not None:
+                children[parent].append(i)
+
+        # Cliques are created in elimination order, so children come before parents
+        upward = [None] * len(self.cliques)
+        for i, clique in enumerate(self.cliques):
+            if self.parent[i] is not None:
+                incoming = [self.potentials[i]] + [upward[child] for child in children[i]]
+                upward[i] = marginalize(product(clique, incoming), clique[1:])
+
+        downward = [None] * len(self.cliques)
+        self.beliefs = [None] * len(self.cliques)
+        for i in reversed(range(len(self.cliques))):
+            clique = self.cliques[i]
+            incoming = [self.potentials[i]] + [upward[child] for child in children[i]]
+            if downward[i] is not None:
+                incoming.append(downward[i])
+            self.beliefs[i] = product(clique, incoming)
+            for child in children[i]:
+                others = [factor for factor in incoming if factor is not upward[child]]
+                downward[child] = marginalize(product(clique, others), self.cliques[child][1:])
+
+    def marginal(self, variable):
+        """
+        Return the normalised distribution over GENES of `variable`.
+        """
+        if self.beliefs is None:
+            self.calibrate()
+        return marginalize(self.beliefs[self.position[variable]], [variable]).table
+
+    def width(self):
+        """
+        Return the number of variables in the largest clique, less one.
+        """
+        return max(len(clique) for clique in self.cliques) - 1
+
+
+def eliminate(factors):
+    """
+    Return (order, cliques) for a list of Factors: a greedy min-fill
+    elimination order of their variables, and the clique each variable
+    forms with its remaining neighbours when it is eliminated. Only the
+    variables are looked at, so this is cheap even when the cliques are
+    far too large to build tables for.
+    """
+    neighbors = {}
+    for factor in factors:
+        for variable in factor.variables:
+            neighbors.setdefault(variable, set()).update(factor.variables)
+    for variable in neighbors:
+        neighbors[variable].discard(variable)
+
+    # Eliminate variables greedily, adding fill-in edges between neighbours;
+    # only scores within two steps of an eliminated variable can change
+    order = []
+    cliques = []
+    scores = {variable: (fill_in(neighbors, variable), len(neighbors[variable]), variable)
+              for variable in neighbors}
+    while scores:
+        variable = min(scores.values())[2]
+        clique = [variable] + sorted(neighbors[variable])
+        affected = set(neighbors[variable])
+        for neighbor in neighbors[variable]:
+            neighbors[neighbor].update(neighbors[variable])
+            neighbors[neighbor].discard(neighbor)
+            neighbors[neighbor].discard(variable)
+            affected.update(neighbors[neighbor])
+        del neighbors[variable]
+        del scores[variable]
+        for neighbor in affected & scores.keys():
+            scores[neighbor] = (fill_in(neighbors, neighbor), len(neighbors[neighbor]), neighbor)
+        order.append(variable)
+        cliques.append(tuple(clique))
+    return order, cliques
+
+
+def fill_in(neighbors, variable):
+    """
+    Return the number of edges that eliminating `variable` would add
+    between its neighbours.
+    """
+    adjacent = list(neighbors[variable])
+    return sum(
+        1 for i, a in enumerate(adjacent) for b in adjacent[i + 1:]
+        if b not in neighbors[a]
+    )
+
+
+def junction_probabilities(people, max_width=None):
+    """
+    Return the same normalised gene and trait distributions per person as
+    enumerating every assignment in `heredity.main`, computed exactly on a
+    junction tree of the pedigree. Raise ValueError before building any
+    table if the tree's width is above `max_width`, since the largest
+    clique's table holds 3 ** (width + 1) numbers.
+    """
+    factors = pedigree_factors(people)
+    elimination = eliminate(factors)
+    width = max((len(clique) for clique in elimination[1]), default=1) - 1
+    if max_width is not None and width > max_width:
+        raise ValueError(f"junction tree width {width} is above {max_width}")
+    tree = JunctionTree(factors, elimination)
+    probabilities = {}
+    for person in people:
+        genes = tree.marginal(person)
+        trait = people[person]["trait"]
+        if trait is None:
+            true = genes @ np.array([PROBS["trait"][gene][True] for gene in GENES])
+        else:
+            true = 1.0 if trait else 0.0
+        probabilities[person] = {
+            "gene": {gene: float(genes[GENES.index(gene)]) for gene in PROBS["gene"]},
+            "trait": {True: float(true), False: float(1 - true)},
+        }
+    return probabilities
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+import multiprocessing
+import os
+import sys
+
+import numpy as np
+
+from heredity import PROBS, load_data, parents_first
+from vectorized import TRUE, UNKNOWN, Pedigree
+
+# Samples drawn per chain
+SAMPLES = 100000
+
+# Independent chains, whose spread gives the confidence intervals
+CHAINS = 8
+
+# Normal quantile of the reported confidence intervals (95%)
+Z = 1.96
+
+# Markov chains advanced in lockstep by `Sampler.gibbs`; mixing depends on
+# the number of sweeps, so fewer walkers sweep more often for the same samples
+WALKERS = 128
+
+# Sweeps each Gibbs chain takes before counting, to forget its start
+BURN_IN = 500
+
+# Likelihood-weighted samples drawn at a time
+BATCH_SIZE = 1 << 16
+
+# Sampler shared read-only with forked worker processes
+shared_sampler = None
+
+
+def main():
+    if len(sys.argv) not in [2, 3, 4]:
+        sys.exit("Usage: python sampling.py data.csv [likelihood|gibbs] [samples]")
+    people = load_data(sys.argv[1])
+    method = sys.argv[2] if len(sys.argv) > 2 else "gibbs"
+    samples = int(sys.argv[3]) if len(sys.argv) > 3 else SAMPLES
+    if method not in METHODS:
+        sys.exit(f"Unknown method {method}, expected one of {', '.join(METHODS)}")
+    probabilities, intervals = sample_probabilities(people, method, samples, seed=0)
+    for person in probabilities:
+        print(f"{person}:")
+        for field in probabilities[person]:
+            print(f"  {field.capitalize()}:")
+            for value in probabilities[person][field]:
+                p = probabilities[person][field][value]
+                print(f"    {value}: {p:.4f} ± {intervals[person][field][value]:.4f}")
+
+
+class Sampler():
+    """
+    Approximate inference on a `load_data` pedigree, drawing many samples
+    at once as NumPy vectors over the tables of a Pedigree. Genes are held
+    as a (people, samples) array so that each person's row is contiguous.
+    """
+    def __init__(self, people):
+        self.pedigree = Pedigree(people)
+        index = {name: i for i, name in enumerate(self.pedigree.names)}
+        self.order = [index[person] for person in parents_first(people)]
+
+        # Cumulative probability of each gene count given the parents'
+        self.cumulative = self.pedigree.inheritance.cumsum(axis=1)
+
+        # Probability of each person's known trait (or 1) given their genes
+        self.likelihood = self.pedigree.traits[:, self.pedigree.evidence].T
+
+        # Each person's children, with the parent axis (1 mother, 2 father) they fill
+        self.children = [[] for person in people]
+        for i, person in enumerate(self.pedigree.names):
+            for axis, parent in [(1, people[person]["mother"]), (2, people[person]["father"])]:
+                if parent in index:
+                    self.children[index[parent]].append((i, axis))
+
+    def __len__(self):
+        return len(self.pedigree)
+
+    def draw(self, i, genes, u):
+        """
+        Return person `i`'s gene count in every sample, drawn from their
+        parents' genes in `genes` for uniform numbers `u`.
+        """
+        mother, father = self.pedigree.parents[i]
+        cumulative = self.cumulative[i][:, genes[mother], genes[father]]
+        return (u >= cumulative[0]).astype(np.int8) + (u >= cumulative[1])
+
+    def likelihood_weighting(self, samples, rng):
+        """
+        Return an (people, 3) array estimating each gene distribution from
+        `samples` forward samples in parents-first order, each weighted by
+        the probability of the known traits. Weights are kept as logarithms
+        so that pedigrees with many known traits do not underflow.
+        """
+        counts = np.zeros((len(self), 3))
+        total = 0
+        reference = -np.inf
+        for start in range(0, samples, BATCH_SIZE):
+            size = min(BATCH_SIZE, samples - start)
+            genes = np.zeros((len(self), size), dtype=np.int8)
+            log_weights = np.zeros(size)
+            for i in self.order:
+                genes[i] = self.draw(i, genes, rng.random(size))
+                if self.pedigree.evidence[i] != UNKNOWN:
+                    log_weights += np.log(self.likelihood[i][genes[i]])
+
+            # Rescale what has been counted so far if this batch has larger weights
+            if log_weights.max() > reference:
+                scale = np.exp(reference - log_weights.max())
+                counts *= scale
+                total *= scale
+                reference = log_weights.max()
+            weights = np.exp(log_weights - reference)
+            total += weights.sum()
+            for i in range(len(self)):
+                counts[i] += np.bincount(genes[i], weights=weights, minlength=3)
+        return counts / total
+
+    def conditional(self, i, genes):
+        """
+        Return a (3, walkers) array of person `i`'s gene distribution given
+        everyone else's genes in every chain: their inheritance, their known
+        trait, and the inheritance of each of their children.
+        """
+        mother, father = self.pedigree.parents[i]
+        weights = self.pedigree.inheritance[i][:, genes[mother], genes[father]]
+        weights = weights * self.likelihood[i][:, None]
+        for child, axis in self.children[i]:
+            mother, father = self.pedigree.parents[child]
+            table = self.pedigree.inheritance[child]
+            if axis == 1:
+                weights = weights * table[genes[child], :, genes[father]].T
+            else:
+                weights = weights * table[genes[child], genes[mother], :].T
+        return weights / weights.sum(axis=0)
+
+    def gibbs(self, samples, rng, walkers=WALKERS):
+        """
+        Return an (people, 3) array estimating each gene distribution from
+        `walkers` Gibbs chains advanced in lockstep, started from forward
+        samples and run BURN_IN sweeps before counting, until `samples`
+        person-sweeps per person have been counted. Each sweep counts every
+        person's conditional distribution rather than the gene drawn from
+        it, which has the same mean and less variance.
+        """
+        genes = np.zeros((len(self), walkers), dtype=np.int8)
+        for i in self.order:
+            genes[i] = self.draw(i, genes, rng.random(walkers))
+        counts = np.zeros((len(self), 3))
+        sweeps = -(-samples // walkers)
+        for sweep in range(BURN_IN + sweeps):
+            for i in self.order:
+                conditional = self.conditional(i, genes)
+                u = rng.random(walkers)
+                genes[i] = (u >= conditional[0]).astype(np.int8) + (u >= conditional[0] + conditional[1])
+                if sweep >= BURN_IN:
+                    counts[i] += conditional.sum(axis=1)
+        return counts / counts.sum(axis=1, keepdims=True)
+
+
+def run_chain(method, samples, seed):
+    """
+    Run one chain of `method` on the sampler inherited from the parent process.
+    """
+    return getattr(shared_sampler, METHODS[method])(samples, np.random.default_rng(seed))
+
+
+def sample_probabilities(people, method="gibbs", samples=SAMPLES, chains=CHAINS, processes=None, seed=None):
+    """
+    Estimate each person's gene and trait distributions with `chains`
+    independent chains of `method` ("likelihood" or "gibbs"), each with
+    its own random stream spawned from `seed`, spread over `processes`
+    forked workers.
+
+    Return (probabilities, intervals): the mean of the chains, in the same
+    form as `powerset_probabilities`, and the half-width of each value's Z
+    confidence interval from the spread between chains.
+    """
+    global shared_sampler
+    shared_sampler = Sampler(people)
+    seeds = np.random.SeedSequence(seed).spawn(chains)
+    jobs = [(method, samples, child) for child in seeds]
+    processes = min(processes or os.cpu_count(), chains)
+    if processes == 1:
+        estimates = [run_chain(*job) for job in jobs]
+    else:
+        context = multiprocessing.get_context("fork")
+        with context.Pool(processes) as pool:
+            estimates = pool.starmap(run_chain, jobs)
+    estimates = np.array(estimates)
+
+    # Unknown traits follow from the genes in each chain; known ones are certain
+    pedigree = shared_sampler.pedigree
+    traits = estimates @ pedigree.traits[:, TRUE]
+    for i, code in enumerate(pedigree.evidence):
+        if code != UNKNOWN:
+            traits[:, i] = 1 if code == TRUE else 0
+
+    genes = estimates.mean(axis=0)
+    gene_widths = interval(estimates)
+    trait_widths = interval(traits)
+    probabilities = dict()
+    intervals = dict()
+    for i, person in enumerate(pedigree.names):
+        p = float(traits[:, i].mean())
+        probabilities[person] = {
+            "gene": {gene: float(genes[i, gene]) for gene in PROBS["gene"]},
+            "trait": {True: p, False: 1 - p}
+        }
+        intervals[person] = {
+            "gene": {gene: float(gene_widths[i, gene]) for gene in PROBS["gene"]},
+            "trait": {True: float(trait_widths[i]), False: float(trait_widths[i])}
+        }
+    return probabilities, intervals
+
+
+def interval(estimates):
+    """
+    Return the half-width of the Z confidence interval of the mean of
+    `estimates`, an array with one row per chain (NaN for a single chain).
+    """
+    if len(estimates) < 2:
+        return np.full(estimates.shape[1:], np.nan)
+    return Z * estimates.std(axis=0, ddof=1) / np.sqrt(len(estimates))
+
+
+# Sampler method run for each method name
+METHODS = {
+    "likelihood": "likelihood_weighting",
+    "gibbs": "gibbs",
+}
+
+
+if __name__ == "__main__":
+    main()
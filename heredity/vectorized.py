@@ -0,0 +1,122 @@
+import sys
+
+import numpy as np
+
+from heredity import PROBS, load_data, passing_prob, print_probabilities
+
+# Gene assignments evaluated per batch
+BATCH_SIZE = 1 << 20
+
+# Trait codes: a known trait, or unknown (summed out, so it contributes 1)
+FALSE, TRUE, UNKNOWN = 0, 1, 2
+
+
+def main():
+    if len(sys.argv) != 2:
+        sys.exit("Usage: python vectorized.py data.csv")
+    people = load_data(sys.argv[1])
+    print_probabilities(vectorized_probabilities(people))
+
+
+class Pedigree():
+    """
+    A `load_data` pedigree as arrays, with people numbered in file order:
+    `parents[i]` holds the numbers of person `i`'s mother and father (or 0
+    for a parent outside the pedigree, whose gene count is then ignored),
+    `inheritance[i, gene, mother gene, father gene]` the probability of
+    person `i`'s gene count, and `traits[gene, code]` the probability of a
+    trait code given the gene count.
+    """
+    def __init__(self, people):
+        self.names = list(people)
+        index = {name: i for i, name in enumerate(self.names)}
+        n = len(self.names)
+        self.parents = np.zeros((n, 2), dtype=np.int64)
+        self.inheritance = np.empty((n, 3, 3, 3))
+        for i, name in enumerate(self.names):
+            mother, father = people[name]["mother"], people[name]["father"]
+            self.parents[i] = [index.get(mother, 0), index.get(father, 0)]
+            if not mother and not father:
+                prior = np.array([PROBS["gene"][gene] for gene in range(3)])
+                self.inheritance[i] = prior[:, None, None]
+                continue
+            m = np.array([passing_prob(people, mother, gene) for gene in range(3)])[:, None]
+            f = np.array([passing_prob(people, father, gene) for gene in range(3)])[None, :]
+            self.inheritance[i] = [(1 - m) * (1 - f), m * (1 - f) + (1 - m) * f, m * f]
+        self.traits = np.array([
+            [PROBS["trait"][gene][False], PROBS["trait"][gene][True], 1] for gene in range(3)
+        ])
+        self.evidence = np.array([
+            UNKNOWN if people[name]["trait"] is None else int(people[name]["trait"])
+            for name in self.names
+        ])
+
+    def __len__(self):
+        return len(self.names)
+
+    def joint_probabilities(self, genes, traits):
+        """
+        Return the vector of `joint_probability` for every row of `genes`,
+        an (assignments, people) array of gene counts, and `traits`, a
+        matching array of trait codes or a single row shared by all.
+        """
+        p = np.ones(len(genes))
+        shared = np.ndim(traits) == 1
+        for i in range(len(self)):
+            mother, father = self.parents[i]
+            if shared:
+                # Fold the trait into the table and look up one flat index
+                table = self.inheritance[i] * self.traits[:, traits[i]][:, None, None]
+                p *= table.ravel().take(genes[:, i] * 9 + genes[:, mother] * 3 + genes[:, father])
+            else:
+                p *= self.inheritance[i][genes[:, i], genes[:, mother], genes[:, father]]
+                p *= self.traits[genes[:, i], traits[:, i]]
+        return p
+
+
+def gene_assignments(n, start, stop):
+    """
+    Return the gene assignments numbered `start` to `stop` of `n` people as
+    an (assignments, people) array, reading each number in base 3. The
+    array is column-major, so that each person's genes are contiguous.
+    """
+    codes = np.arange(start, stop)
+    genes = np.empty((len(codes), n), dtype=np.int8, order="F")
+    for i in range(n):
+        genes[:, i] = codes % 3
+        codes //= 3
+    return genes
+
+
+def vectorized_probabilities(people, batch_size=BATCH_SIZE):
+    """
+    Return the same distributions as `powerset_probabilities`, evaluating
+    every one of the 3^n gene assignments in NumPy batches, with known
+    traits fixed and unknown traits summed out, and accumulating gene
+    distributions with bincount instead of per-assignment `update` calls.
+    """
+    pedigree = Pedigree(people)
+    n = len(pedigree)
+    counts = np.zeros((n, 3))
+    for start in range(0, 3 ** n, batch_size):
+        genes = gene_assignments(n, start, min(3 ** n, start + batch_size))
+        p = pedigree.joint_probabilities(genes, pedigree.evidence)
+        for i in range(n):
+            counts[i] += np.bincount(genes[:, i], weights=p, minlength=3)
+    counts /= counts.sum(axis=1, keepdims=True)
+
+    probabilities = dict()
+    for i, person in enumerate(pedigree.names):
+        if pedigree.evidence[i] == UNKNOWN:
+            p = float(counts[i] @ pedigree.traits[:, TRUE])
+        else:
+            p = float(pedigree.evidence[i])
+        probabilities[person] = {
+            "gene": {gene: float(counts[i, gene]) for gene in PROBS["gene"]},
+            "trait": {True: p, False: 1 - p}
+        }
+    return probabilities
+
+
+if __name__ == "__main__":
+    main()
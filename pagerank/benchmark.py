@@ -0,0 +1,232 @@
+import json
+import random
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from pagerank import DAMPING, crawl, iterate_pagerank, sample_pagerank
+from incremental import update_pagerank
+from instrumentation import PageRankStats
+from matrix import LinkGraph, matrix_pagerank, power_iteration
+from personalized import TOP_K, forward_push, top_pages
+from sampling import alias_pagerank, batch_pagerank
+from solvers import SOLVERS
+
+# Bundled corpora benchmarked when none are given
+CORPORA = ["corpus0", "corpus1", "corpus2"]
+
+# Steps sampled per run; the original sampler is slow, so it gets fewer
+SAMPLES = 1000000
+LEGACY_SAMPLES = 100000
+
+# The original sampler costs O(pages) per step, so it is skipped on larger corpora
+LEGACY_PAGES = 1000
+
+# Synthetic corpus sizes added to the bundled corpora by `convergence`
+SYNTHETIC_SIZES = [1000, 10000, 100000]
+
+
+def main():
+    if len(sys.argv) < 2 or sys.argv[1] not in COMMANDS:
+        sys.exit(f"Usage: python benchmark.py ({'|'.join(COMMANDS)}) [args...]")
+    COMMANDS[sys.argv[1]](sys.argv[2:])
+
+
+def sampling(args):
+    """
+    Compare steps per second and error against iteration for `sample_pagerank`
+    and the alias-table and lockstep samplers on each corpus in `args`: a directory, or a
+    number of pages for a synthetic power-law corpus.
+    """
+    for name, corpus in load_corpora(args):
+        exact = iterate_pagerank(corpus, DAMPING)
+        print(f"{name} ({len(corpus)} pages)")
+        samplers = [
+            ("alias_pagerank", lambda n: alias_pagerank(corpus, DAMPING, n), SAMPLES),
+            ("batch_pagerank", lambda n: batch_pagerank(corpus, DAMPING, n, processes=1), SAMPLES),
+            ("batch_pagerank (pool)", lambda n: batch_pagerank(corpus, DAMPING, n), SAMPLES),
+        ]
+        if len(corpus) <= LEGACY_PAGES:
+            samplers.insert(0, ("sample_pagerank", lambda n: sample_pagerank(corpus, DAMPING, n), LEGACY_SAMPLES))
+        for sampler, sample, n in samplers:
+            start = time.perf_counter()
+            ranks = sample(n)
+            elapsed = time.perf_counter() - start
+            error = max(abs(ranks[page] - exact[page]) for page in corpus)
+            print(f"  {sampler:22} {n / elapsed:12,.0f} steps/s  max error {error:.4f}")
+
+
+def incremental(args):
+    """
+    Compare recomputing PageRank with `update_pagerank` after a few pages of
+    each corpus in `args` change their links: `--edits N` pages (default 10).
+    """
+    edits, args = option(args, "--edits", "10")
+    edits = int(edits)
+    for name, corpus in load_corpora(args):
+        ranks, iterations = matrix_pagerank(corpus, DAMPING)
+        rng = random.Random(0)
+        pages = sorted(corpus)
+        delta = {}
+        for page in rng.sample(pages, min(edits, len(pages))):
+            delta[page] = {rng.choice(pages) for i in range(rng.randint(0, 5))} - {page}
+
+        start = time.perf_counter()
+        updated_ranks, updated, pushes = update_pagerank(corpus, ranks, delta, DAMPING)
+        incremental_time = time.perf_counter() - start
+        start = time.perf_counter()
+        exact, iterations = matrix_pagerank(updated, DAMPING)
+        full_time = time.perf_counter() - start
+        error = sum(abs(updated_ranks[page] - exact[page]) for page in corpus)
+        print(f"{name} ({len(corpus)} pages, {len(delta)} edited)")
+        print(f"  {'full recompute':20} {full_time:8.3f}s  {iterations} iterations")
+        print(f"  {'update_pagerank':20} {incremental_time:8.3f}s  {pushes} pushes, L1 difference {error:.2e}")
+
+
+def personalized(args):
+    """
+    Compare `forward_push` with full personalized power iteration for a few
+    single-page seeds on each corpus in `args`: time, pages touched, L1
+    error and how many of the top pages agree.
+    """
+    for name, corpus in load_corpora(args):
+        graph = LinkGraph.from_corpus(corpus)
+        index = {page: i for i, page in enumerate(graph.pages)}
+        print(f"{name} ({len(corpus)} pages)")
+        for seed in random.Random(0).sample(graph.pages, min(3, len(graph))):
+            start = time.perf_counter()
+            ranks, residual, pushes = forward_push(corpus, seed, DAMPING)
+            push_time = time.perf_counter() - start
+
+            teleport = np.zeros(len(graph))
+            teleport[index[seed]] = 1
+            start = time.perf_counter()
+            exact, iterations = power_iteration(graph, DAMPING, 1e-10, teleport=teleport)
+            power_time = time.perf_counter() - start
+
+            # Pages never reached count their whole exact rank as error
+            reached = [index[page] for page in ranks]
+            error = 1 - exact[reached].sum() + np.abs(exact[reached] - list(ranks.values())).sum()
+            order = [i for i in np.argsort(-exact, kind="stable") if i != index[seed] and exact[i] > 0]
+            exact_top = {graph.pages[i] for i in order[:TOP_K]}
+            top = {page for page, rank in top_pages(corpus, seed, TOP_K, DAMPING)}
+            print(f"  seed {seed}")
+            print(f"    {'power iteration':16} {power_time:8.4f}s  {iterations} iterations")
+            print(f"    {'forward_push':16} {push_time:8.4f}s  {pushes} pushes, {len(ranks)} pages, "
+                  f"L1 error {error:.2e}, top {TOP_K} overlap {len(top & exact_top)}/{len(exact_top)}")
+
+
+def convergence(args):
+    """
+    Instrument `sample_pagerank`, `iterate_pagerank` and `matrix_pagerank`
+    on each corpus in `args` (by default the bundled corpora and synthetic
+    corpora of growing size) and report sweeps, residuals, rates and peak
+    memory. `--damping a,b,...` tries several damping factors, `--json`
+    prints one JSON object per run instead, and `--trace-memory` measures
+    each run's peak with tracemalloc (slower) instead of the process peak.
+    """
+    damping, args = option(args, "--damping", str(DAMPING))
+    as_json = "--json" in args
+    trace_memory = "--trace-memory" in args
+    args = [arg for arg in args if arg not in ["--json", "--trace-memory"]]
+    if trace_memory:
+        tracemalloc.start()
+    for name, corpus in load_corpora(args or CORPORA + [str(size) for size in SYNTHETIC_SIZES]):
+        for damping_factor in [float(value) for value in damping.split(",")]:
+            methods = [
+                ("iterate_pagerank", lambda stats: iterate_pagerank(corpus, damping_factor, stats)),
+                ("matrix_pagerank", lambda stats: matrix_pagerank(corpus, damping_factor, stats=stats)),
+            ]
+            if len(corpus) <= LEGACY_PAGES:
+                methods.insert(0, ("sample_pagerank",
+                                   lambda stats: sample_pagerank(corpus, damping_factor, LEGACY_SAMPLES, stats)))
+            if not as_json:
+                print(f"{name} ({len(corpus)} pages, damping {damping_factor})")
+            for method, run in methods:
+                stats = PageRankStats(method)
+                if trace_memory:
+                    tracemalloc.reset_peak()
+                run(stats)
+                if as_json:
+                    print(json.dumps({"corpus": name, "pages": len(corpus), "damping": damping_factor,
+                                      **stats.as_dict()}))
+                else:
+                    print(f"  {stats.report()}")
+
+
+def solvers(args):
+    """
+    Compare iterations, wall time and L1 error against a tightly converged
+    reference for every solver in SOLVERS, and `iterate_pagerank` with its
+    fixed threshold, on each corpus in `args`. `--tolerance a,b,...` sets
+    the tolerances tried (default 1e-6,1e-8).
+    """
+    tolerances, args = option(args, "--tolerance", "1e-6,1e-8")
+    for name, corpus in load_corpora(args or CORPORA + [str(size) for size in SYNTHETIC_SIZES]):
+        graph = LinkGraph.from_corpus(corpus)
+        reference, iterations = power_iteration(graph, DAMPING, 1e-13)
+        print(f"{name} ({len(corpus)} pages)")
+
+        stats = PageRankStats("iterate_pagerank")
+        ranks = iterate_pagerank(corpus, DAMPING, stats)
+        error = sum(abs(ranks[page] - reference[i]) for i, page in enumerate(graph.pages))
+        print(f"  {'iterate_pagerank':16} {'':>8} {len(stats.sweeps):5} iterations {stats.seconds:8.3f}s  "
+              f"L1 error {error:.2e}")
+        for tolerance in [float(value) for value in tolerances.split(",")]:
+            for solver, solve in SOLVERS.items():
+                start = time.perf_counter()
+                ranks, iterations = solve(graph, DAMPING, tolerance)
+                elapsed = time.perf_counter() - start
+                error = np.abs(ranks - reference).sum()
+                print(f"  {solver:16} {tolerance:8.0e} {iterations:5} iterations {elapsed:8.3f}s  L1 error {error:.2e}")
+
+
+def option(args, name, default):
+    """
+    Return (value, remaining args) for a `name value` option in `args`.
+    """
+    if name not in args:
+        return default, args
+    i = args.index(name)
+    return args[i + 1], args[:i] + args[i + 2:]
+
+
+def load_corpora(args):
+    """
+    Yield (name, corpus) for each argument: a corpus directory to crawl, or a
+    page count for a synthetic corpus. Defaults to the bundled corpora.
+    """
+    for arg in args or CORPORA:
+        if arg.isdigit():
+            yield f"synthetic {arg}", synthetic_corpus(int(arg))
+        else:
+            yield arg, crawl(arg)
+
+
+def synthetic_corpus(n, links=8, seed=0):
+    """
+    Return a `crawl`-style corpus of `n` pages whose in-degrees follow a
+    power law, with up to `links` out-links per page.
+    """
+    rng = random.Random(seed)
+    pages = [f"{i}.html" for i in range(n)]
+    corpus = {}
+    for page in pages:
+        targets = {pages[min(n - 1, int(rng.paretovariate(1)) - 1)] for _ in range(rng.randint(0, links))}
+        corpus[page] = targets - {page}
+    return corpus
+
+
+COMMANDS = {
+    "sampling": sampling,
+    "incremental": incremental,
+    "personalized": personalized,
+    "convergence": convergence,
+    "solvers": solvers,
+}
+
+
+if __name__ == "__main__":
+    main()
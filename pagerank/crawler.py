@@ -0,0 +1,286 @@
+import json
+import mmap
+import os
+import re
+import struct
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from matrix import LinkGraph
+
+LINK = re.compile(r"<a\s+(?:[^>]*?)href=\"([^\"]*)\"")
+
+# Characters read from a file at a time
+CHUNK_SIZE = 1 << 16
+
+# Longest unfinished tag carried over between chunks
+TAIL_LIMIT = 1 << 16
+
+# Files handed to a worker process at a time
+BATCH_SIZE = 64
+
+# Link cache written into the corpus directory, and its format version
+CACHE_NAME = "links.cache"
+CACHE_MAGIC = b"LINKCACH"
+CACHE_VERSION = 1
+
+# Magic, version, then counts of pages, links, and bytes of the two JSON sections
+HEADER = struct.Struct("<8sI4xqqqq")
+
+
+def main():
+    if len(sys.argv) not in [2, 3]:
+        sys.exit("Usage: python crawler.py corpus [processes]")
+    processes = int(sys.argv[2]) if len(sys.argv) == 3 else None
+    stats = CrawlStats()
+    graph = load_link_graph(sys.argv[1], processes, stats)
+    print(f"{len(graph)} pages, {len(graph.indices)} links")
+    print(stats.report())
+
+
+class CrawlStats():
+    """
+    Files and characters read while crawling, and the seconds it took.
+    """
+    def __init__(self):
+        self.files = 0
+        self.cached = 0
+        self.characters = 0
+        self.seconds = 0
+
+    def report(self):
+        """
+        Returns a one-line human-readable summary.
+        """
+        rate = self.files / self.seconds if self.seconds else 0
+        return (f"Crawled {self.files} files ({self.characters / 2 ** 20:.1f} MiB) "
+                f"in {self.seconds:.2f}s, {rate:,.0f} files/s, {self.cached} unchanged files cached")
+
+
+def crawl_links(directory, processes=None, stats=None):
+    """
+    Parse a directory of HTML pages in a pool of `processes` workers.
+
+    Return (pages, links) where `pages` is the sorted list of page filenames
+    and `links[i]` is the set of indices of other pages linked to by page `i`.
+    Page names are interned up front from the directory listing, so links to
+    pages outside the corpus are dropped as each file is parsed.
+    """
+    start = time.perf_counter()
+    pages = sorted(
+        entry.name for entry in os.scandir(directory)
+        if entry.name.endswith(".html") and entry.is_file()
+    )
+    index = {page: i for i, page in enumerate(pages)}
+    results = parse_files(directory, pages, processes)
+    links = intern_links(results, index, stats)
+    if stats is not None:
+        stats.seconds += time.perf_counter() - start
+    return pages, links
+
+
+def parse_files(directory, pages, processes=None):
+    """
+    Yield the `extract_links` result for each page in `directory`, in order,
+    parsing in a pool of `processes` workers when there are enough pages.
+    """
+    paths = [os.path.join(directory, page) for page in pages]
+    if processes == 1 or len(paths) <= BATCH_SIZE:
+        yield from map(extract_links, paths)
+    else:
+        with ProcessPoolExecutor(processes) as executor:
+            yield from executor.map(extract_links, paths, chunksize=BATCH_SIZE)
+
+
+def load_link_graph(directory, processes=None, stats=None):
+    """
+    Return the LinkGraph of a directory of HTML pages, using the link cache
+    in that directory: if no page was added, removed or changed (by mtime
+    and size) the cached adjacency is memory-mapped as is; otherwise only
+    the changed pages are re-parsed, and the cache is rewritten.
+    """
+    start = time.perf_counter()
+    entries = sorted(
+        (entry.name, entry.stat()) for entry in os.scandir(directory)
+        if entry.name.endswith(".html") and entry.is_file()
+    )
+    pages = [name for name, stat in entries]
+    signature = np.array([[stat.st_mtime_ns, stat.st_size] for name, stat in entries], dtype=np.int64)
+    signature = signature.reshape(len(pages), 2)
+
+    cache = LinkCache.load(directory)
+    if cache is not None and cache.pages == pages and np.array_equal(cache.signature, signature):
+        if stats is not None:
+            stats.cached += len(pages)
+            stats.seconds += time.perf_counter() - start
+        return LinkGraph(pages, cache.indptr, cache.indices)
+
+    # Reuse the extracted links of every page whose mtime and size are unchanged
+    previous = {}
+    if cache is not None:
+        old_hrefs = cache.hrefs()
+        for i, page in enumerate(cache.pages):
+            previous[page] = (tuple(cache.signature[i]), old_hrefs[i])
+    hrefs = [None] * len(pages)
+    changed = []
+    for i, page in enumerate(pages):
+        if page in previous and previous[page][0] == tuple(signature[i]):
+            hrefs[i] = previous[page][1]
+        else:
+            changed.append(i)
+    for i, (characters, found) in zip(changed, parse_files(directory, [pages[i] for i in changed], processes)):
+        hrefs[i] = sorted(found)
+        if stats is not None:
+            stats.files += 1
+            stats.characters += characters
+    if stats is not None:
+        stats.cached += len(pages) - len(changed)
+
+    index = {page: i for i, page in enumerate(pages)}
+    links = [{index[href] for href in page_hrefs if href in index} - {i} for i, page_hrefs in enumerate(hrefs)]
+    graph = LinkGraph.from_links(pages, links)
+    try:
+        LinkCache.save(directory, pages, signature, graph, hrefs)
+    except OSError:
+        pass
+    if stats is not None:
+        stats.seconds += time.perf_counter() - start
+    return graph
+
+
+class LinkCache():
+    """
+    On-disk cache of a crawled corpus: the (mtime_ns, size) of every page,
+    the compiled CSR adjacency, and each page's raw hrefs, kept as JSON that
+    is only parsed when some page changed and links must be recompiled.
+    """
+    def __init__(self, pages, signature, indptr, indices, hrefs_data, buffer):
+        self.pages = pages
+        self.signature = signature
+        self.indptr = indptr
+        self.indices = indices
+        self.hrefs_data = hrefs_data
+
+        # Memory map backing the arrays
+        self.buffer = buffer
+
+    @classmethod
+    def load(cls, directory):
+        """
+        Memory-map the cache in `directory`,
+        or return None if it is missing or from another version.
+        """
+        try:
+            with open(os.path.join(directory, CACHE_NAME), "rb") as f:
+                buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, version, pages, links, pages_size, hrefs_size = HEADER.unpack_from(buffer)
+            if magic != CACHE_MAGIC or version != CACHE_VERSION:
+                return None
+            start = HEADER.size
+            signature = np.frombuffer(buffer, np.int64, pages * 2, start).reshape(pages, 2)
+            start += signature.nbytes
+            indptr = np.frombuffer(buffer, np.int64, pages + 1, start)
+            start += indptr.nbytes
+            indices = np.frombuffer(buffer, np.int64, links, start)
+            start += indices.nbytes
+            names = json.loads(buffer[start:start + pages_size].decode("utf-8"))
+            start += pages_size
+            hrefs_data = memoryview(buffer)[start:start + hrefs_size]
+        except (OSError, ValueError, struct.error):
+            return None
+        return cls(names, signature, indptr, indices, hrefs_data, buffer)
+
+    @staticmethod
+    def save(directory, pages, signature, graph, hrefs):
+        """
+        Write the cache for `pages` to `directory`, replacing any older one.
+        """
+        pages_data = json.dumps(pages).encode("utf-8")
+        hrefs_data = json.dumps(hrefs).encode("utf-8")
+        path = os.path.join(directory, CACHE_NAME)
+        temporary = path + ".tmp"
+        with open(temporary, "wb") as f:
+            f.write(HEADER.pack(CACHE_MAGIC, CACHE_VERSION, len(pages), len(graph.indices),
+                                len(pages_data), len(hrefs_data)))
+            for section in [signature, graph.indptr, graph.indices]:
+                f.write(np.ascontiguousarray(section, dtype=np.int64).tobytes())
+            f.write(pages_data)
+            f.write(hrefs_data)
+        os.replace(temporary, path)
+
+    def hrefs(self):
+        """
+        Returns the list of raw hrefs for every cached page.
+        """
+        return json.loads(bytes(self.hrefs_data).decode("utf-8"))
+
+
+def intern_links(results, index, stats):
+    """
+    Return the list of linked page index sets for the (characters, hrefs)
+    results of `extract_links`, in page order.
+    """
+    links = []
+    for i, (characters, hrefs) in enumerate(results):
+        links.append({index[href] for href in hrefs if href in index} - {i})
+        if stats is not None:
+            stats.files += 1
+            stats.characters += characters
+    return links
+
+
+def extract_links(path):
+    """
+    Stream the HTML file at `path` in chunks and return (characters read,
+    set of href values of its <a> tags), never holding the whole file.
+    """
+    hrefs = set()
+    characters = 0
+    tail = ""
+    with open(path) as f:
+        while True:
+            chunk = f.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            characters += len(chunk)
+            text = tail + chunk
+            end = 0
+            for match in LINK.finditer(text):
+                hrefs.add(match.group(1))
+                end = match.end()
+
+            # Carry over a tag that may continue into the next chunk
+            opening = text.rfind("<", end)
+            if opening != -1 and ">" not in text[opening:] and len(text) - opening <= TAIL_LIMIT:
+                tail = text[opening:]
+            else:
+                tail = ""
+    return characters, hrefs
+
+
+def parallel_crawl(directory, processes=None, stats=None):
+    """
+    Return the same page -> set of linked pages dictionary as `crawl`,
+    built with `crawl_links`.
+    """
+    pages, links = crawl_links(directory, processes, stats)
+    return {page: {pages[link] for link in links[i]} for i, page in enumerate(pages)}
+
+
+def cached_crawl(directory, processes=None):
+    """
+    Return the same page -> set of linked pages dictionary as `crawl`,
+    built from the link cache with `load_link_graph`.
+    """
+    graph = load_link_graph(directory, processes)
+    return {
+        page: {graph.pages[link] for link in graph.indices[graph.indptr[i]:graph.indptr[i + 1]]}
+        for i, page in enumerate(graph.pages)
+    }
+
+
+if __name__ == "__main__":
+    main()
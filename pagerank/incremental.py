@@ -0,0 +1,70 @@
+from collections import defaultdict, deque
+
+# Bound on the L1 error that the pushes may add to the previous ranks
+TOLERANCE = 1e-6
+
+
+def update_pagerank(corpus, ranks, delta, damping_factor, tolerance=TOLERANCE):
+    """
+    Return (new ranks, updated corpus, pushes) after some pages change their
+    links, starting from the `ranks` already computed for `corpus`.
+
+    `delta` maps each changed page to its new set of linked pages; pages
+    cannot be added or removed. Neither `corpus` nor `ranks` is modified.
+
+    The ranks are scaled to the solution of y = (1 - d) / N + d * A y, where
+    dangling pages simply lose their rank; normalising y gives PageRank with
+    dangling pages linking everywhere. Only the columns of A that changed
+    leave a residual, which is pushed along out-links (Gauss-Southwell)
+    until no page holds more than its share of `tolerance`, so the work
+    stays near the edited pages instead of sweeping the whole corpus.
+    """
+    for page, links in delta.items():
+        if page not in corpus or any(link not in corpus for link in links):
+            raise ValueError(f"delta for {page} refers to pages outside the corpus")
+
+    # Recover y from the normalised ranks: summing y = b + dAy gives
+    # sum(y) = (1 - d) / (1 - d * (1 - dangling rank))
+    dangling = sum(ranks[page] for page in corpus if not corpus[page])
+    scale = (1 - damping_factor) / (1 - damping_factor * (1 - dangling))
+    y = {page: rank * scale for page, rank in ranks.items()}
+    total = scale
+
+    # The residual b + dA'y - y is the change in what each page receives
+    updated = dict(corpus)
+    residual = defaultdict(float)
+    for page, links in delta.items():
+        for link in corpus[page] - {page}:
+            residual[link] -= damping_factor * y[page] / len(corpus[page] - {page})
+        links = set(links) - {page}
+        for link in links:
+            residual[link] += damping_factor * y[page] / len(links)
+        updated[page] = links
+
+    # Pushing page u moves r_u into y_u and d * r_u onto its links, so the
+    # total |residual| shrinks by at least (1 - d)|r_u|; stopping below
+    # `threshold` everywhere bounds the L1 error of y by `tolerance`
+    threshold = tolerance * (1 - damping_factor) / len(corpus)
+    queue = deque(page for page in residual if abs(residual[page]) > threshold)
+    queued = set(queue)
+    pushes = 0
+    while queue:
+        page = queue.popleft()
+        queued.discard(page)
+        r = residual.pop(page, 0.0)
+        if abs(r) <= threshold:
+            continue
+        pushes += 1
+        y[page] += r
+        total += r
+        links = updated[page]
+        if not links:
+            continue
+        share = damping_factor * r / len(links)
+        for link in links:
+            residual[link] += share
+            if link not in queued and abs(residual[link]) > threshold:
+                queue.append(link)
+                queued.add(link)
+
+    return {page: value / total for page, value in y.items()}, updated, pushes
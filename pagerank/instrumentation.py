@@ -0,0 +1,90 @@
+import resource
+import sys
+import tracemalloc
+
+
+class PageRankStats():
+    """
+    Convergence and cost of one PageRank run. Iterative methods record the
+    L1 and largest change and the seconds of every sweep; sampling records
+    the L1 change of its estimate between checkpoints and its sampling rate.
+    """
+    def __init__(self, method):
+        self.method = method
+        self.sweeps = []
+        self.checkpoints = []
+        self.samples = 0
+        self.seconds = 0
+        self.peak_memory = None
+
+        # Sampling estimate at the last checkpoint
+        self.estimate = None
+
+    def sweep(self, residual, largest, seconds):
+        """
+        Record one sweep: the L1 norm and the largest entry of the change
+        in ranks, and the seconds it took.
+        """
+        self.sweeps.append({"residual": residual, "largest": largest, "seconds": seconds})
+
+    def checkpoint(self, counts, samples, seconds):
+        """
+        Record the sampling estimate from visit `counts` after `samples`
+        steps and `seconds` since sampling started.
+        """
+        estimate = {page: count / samples for page, count in counts.items()}
+        change = None
+        if self.estimate is not None:
+            change = sum(abs(estimate[page] - self.estimate[page]) for page in estimate)
+        self.estimate = estimate
+        self.checkpoints.append({"samples": samples, "seconds": seconds, "change": change})
+
+    def finish(self, seconds, samples=0):
+        """
+        Record the total seconds and samples of the run and the peak memory.
+        """
+        self.seconds = seconds
+        self.samples = samples
+        self.peak_memory = peak_memory()
+
+    def as_dict(self):
+        """
+        Returns the statistics as a JSON-serialisable dictionary.
+        """
+        return {
+            "method": self.method,
+            "seconds": self.seconds,
+            "iterations": len(self.sweeps),
+            "sweeps": self.sweeps,
+            "samples": self.samples,
+            "steps_per_second": self.samples / self.seconds if self.samples and self.seconds else None,
+            "checkpoints": self.checkpoints,
+            "peak_memory": self.peak_memory,
+            "memory_source": "tracemalloc" if tracemalloc.is_tracing() else "rusage",
+        }
+
+    def report(self):
+        """
+        Returns a one-line human-readable summary.
+        """
+        line = f"{self.method}: {self.seconds:.3f}s"
+        if self.sweeps:
+            line += f", {len(self.sweeps)} sweeps, final residual {self.sweeps[-1]['residual']:.2e}"
+        if self.samples:
+            line += f", {self.samples / self.seconds:,.0f} steps/s"
+            if len(self.checkpoints) > 1:
+                line += f", final change {self.checkpoints[-1]['change']:.2e}"
+        if self.peak_memory is not None:
+            line += f", peak memory {self.peak_memory / 2 ** 20:.1f} MiB"
+        return line
+
+
+def peak_memory():
+    """
+    Return the peak memory in bytes: traced by tracemalloc since its last
+    reset if it is running, otherwise the peak resident set size of the process.
+    """
+    if tracemalloc.is_tracing():
+        return tracemalloc.get_traced_memory()[1]
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
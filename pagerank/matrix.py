@@ -0,0 +1,142 @@
+import sys
+import time
+
+import numpy as np
+
+from pagerank import DAMPING
+
+# Stop power iteration once the L1 change between sweeps falls below this
+TOLERANCE = 1e-6
+
+# Give up after this many sweeps even if not converged
+MAX_ITERATIONS = 1000
+
+
+def main():
+    if len(sys.argv) != 2:
+        sys.exit("Usage: python matrix.py corpus")
+
+    # crawler builds LinkGraphs from its cache, so it imports this module
+    from crawler import cached_crawl
+    corpus = cached_crawl(sys.argv[1])
+    ranks, iterations = matrix_pagerank(corpus, DAMPING)
+    print(f"PageRank Results from Power Iteration ({iterations} iterations)")
+    for page in sorted(ranks):
+        print(f"  {page}: {ranks[page]:.4f}")
+
+
+class LinkGraph():
+    """
+    Crawled corpus with pages interned to dense indices and links stored as a
+    CSR matrix by source page: page `i` links to `indices[indptr[i]:indptr[i + 1]]`.
+    """
+    def __init__(self, pages, indptr, indices):
+        self.pages = pages
+        self.indptr = indptr
+        self.indices = indices
+        self.out_degree = np.diff(indptr)
+        self.dangling = self.out_degree == 0
+
+    @classmethod
+    def from_corpus(cls, corpus):
+        """
+        Build the graph from a `crawl` dictionary of page -> set of linked pages.
+        """
+        pages = sorted(corpus)
+        index = {page: i for i, page in enumerate(pages)}
+        return cls.from_links(pages, [{index[link] for link in corpus[page]} for page in pages])
+
+    @classmethod
+    def from_links(cls, pages, links):
+        """
+        Build the graph from a list of pages and, for each, the set of
+        indices of the pages it links to, as returned by `crawl_links`.
+        """
+        indptr = np.zeros(len(pages) + 1, dtype=np.int64)
+        np.cumsum([len(targets) for targets in links], dtype=np.int64, out=indptr[1:])
+        indices = np.fromiter(
+            (target for targets in links for target in sorted(targets)),
+            dtype=np.int64, count=int(indptr[-1])
+        )
+        return cls(pages, indptr, indices)
+
+    def __len__(self):
+        return len(self.pages)
+
+    def in_links(self):
+        """
+        Return the transposed CSR arrays (indptr, sources, targets): the
+        pages linking to page `j` are `sources[indptr[j]:indptr[j + 1]]`,
+        and `targets` repeats each `j` once per incoming link.
+        """
+        order = np.argsort(self.indices, kind="stable")
+        sources = np.repeat(np.arange(len(self)), self.out_degree)[order]
+        targets = self.indices[order]
+        indptr = np.zeros(len(self) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(targets, minlength=len(self)), out=indptr[1:])
+        return indptr, sources, targets
+
+    def propagate(self, ranks):
+        """
+        Return the rank each page receives from following links when every
+        page splits `ranks` evenly over its out-links (dangling pages give none).
+        """
+        share = np.divide(ranks, self.out_degree, out=np.zeros_like(ranks), where=~self.dangling)
+        return np.bincount(self.indices, weights=np.repeat(share, self.out_degree), minlength=len(self))
+
+    def step(self, ranks, damping_factor, teleport=None):
+        """
+        Return one PageRank sweep from `ranks`. Random jumps, and steps from
+        dangling pages, land on a page drawn from the `teleport` vector, or
+        uniformly over the corpus if it is None.
+        """
+        jumping = 1 - damping_factor + damping_factor * ranks[self.dangling].sum()
+        spread = jumping / len(self) if teleport is None else jumping * teleport
+        return spread + damping_factor * self.propagate(ranks)
+
+    def ranks(self, vector):
+        """
+        Return a rank vector as a dictionary of page -> rank.
+        """
+        return {page: float(rank) for page, rank in zip(self.pages, vector)}
+
+
+def power_iteration(graph, damping_factor, tolerance=TOLERANCE, max_iterations=MAX_ITERATIONS, teleport=None,
+                    stats=None):
+    """
+    Run PageRank power iteration on a LinkGraph from the uniform vector until
+    the L1 change between sweeps is below `tolerance`. A `teleport` vector
+    summing to 1 gives personalized PageRank instead.
+
+    Return (ranks, iterations) where `ranks` is a NumPy vector summing to 1.
+    If `stats` is a PageRankStats, every sweep's change and time is recorded there.
+    """
+    start = time.perf_counter()
+    ranks = np.full(len(graph), 1 / len(graph))
+    for iteration in range(1, max_iterations + 1):
+        sweep_start = time.perf_counter()
+        new_ranks = graph.step(ranks, damping_factor, teleport)
+        changes = np.abs(new_ranks - ranks)
+        change = changes.sum()
+        if stats is not None:
+            stats.sweep(float(change), float(changes.max()), time.perf_counter() - sweep_start)
+        ranks = new_ranks
+        if change < tolerance:
+            break
+    if stats is not None:
+        stats.finish(time.perf_counter() - start)
+    return ranks / ranks.sum(), iteration
+
+
+def matrix_pagerank(corpus, damping_factor, tolerance=TOLERANCE, stats=None):
+    """
+    Return (PageRank dictionary, iterations) for a `crawl` corpus,
+    computed by sparse power iteration.
+    """
+    graph = LinkGraph.from_corpus(corpus)
+    ranks, iterations = power_iteration(graph, damping_factor, tolerance, stats=stats)
+    return graph.ranks(ranks), iterations
+
+
+if __name__ == "__main__":
+    main()
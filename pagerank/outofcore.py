@@ -0,0 +1,247 @@
+import mmap
+import os
+import shutil
+import struct
+import sys
+import time
+
+import numpy as np
+
+from crawler import parse_files
+from matrix import MAX_ITERATIONS, TOLERANCE
+from pagerank import DAMPING
+
+# Magic and format version of edge list files
+EDGES_MAGIC = b"EDGELIST"
+EDGES_VERSION = 1
+
+# Magic, version, then counts of pages and edges
+HEADER = struct.Struct("<8sI4xqq")
+
+# Page ids, out-degrees and (source, target) pairs are stored as this type
+ID_TYPE = np.dtype("<i4")
+
+# Edges streamed per block of a sweep
+EDGE_BLOCK = 1 << 20
+
+# Pages whose out-degrees are read per block when summing dangling rank
+PAGE_BLOCK = 1 << 20
+
+# Pages listed by the command line
+TOP_K = 10
+
+
+def main():
+    if len(sys.argv) not in [3, 4]:
+        sys.exit("Usage: python outofcore.py corpus edgelist [processes]")
+    processes = int(sys.argv[3]) if len(sys.argv) == 4 else None
+    start = time.perf_counter()
+    pages, edges = write_directory(sys.argv[1], sys.argv[2], processes)
+    print(f"Wrote {pages} pages, {edges} links in {time.perf_counter() - start:.2f}s")
+
+    start = time.perf_counter()
+    with EdgeList(sys.argv[2]) as graph:
+        ranks, iterations = streaming_power_iteration(graph, DAMPING)
+    print(f"PageRank Results from Streaming Power Iteration ({iterations} iterations, "
+          f"{time.perf_counter() - start:.2f}s)")
+    top = np.argsort(-ranks, kind="stable")[:TOP_K]
+    names = read_pages(sys.argv[2], set(top.tolist()))
+    for i in top:
+        print(f"  {names[i]}: {ranks[i]:.4f}")
+
+
+class EdgeListWriter():
+    """
+    Writes an edge list file one page at a time, in page order, so that the
+    graph never has to be held in memory: (source, target) pairs sorted by
+    source, followed by the out-degree of every page, with page names in a
+    separate `<path>.pages` file, one per line.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.pages = 0
+        self.edges = 0
+        self.file = open(path + ".tmp", "wb")
+        self.file.write(HEADER.pack(EDGES_MAGIC, EDGES_VERSION, 0, 0))
+        self.degrees = open(path + ".degrees.tmp", "wb")
+        self.names = open(path + ".pages.tmp", "w", encoding="utf-8")
+
+    def add(self, name, targets):
+        """
+        Append the next page, `name`, with links to the page ids `targets`.
+        """
+        if "\n" in name:
+            raise ValueError(f"page name {name!r} contains a newline")
+        targets = np.unique(np.asarray(list(targets), dtype=ID_TYPE))
+        pairs = np.empty((len(targets), 2), dtype=ID_TYPE)
+        pairs[:, 0] = self.pages
+        pairs[:, 1] = targets
+        self.file.write(pairs.tobytes())
+        self.degrees.write(np.array([len(targets)], dtype=ID_TYPE).tobytes())
+        self.names.write(name + "\n")
+        self.pages += 1
+        self.edges += len(targets)
+
+    def close(self):
+        """
+        Append the out-degrees, fill in the header and move the files into place.
+        """
+        self.degrees.close()
+        with open(self.path + ".degrees.tmp", "rb") as f:
+            shutil.copyfileobj(f, self.file)
+        os.remove(self.path + ".degrees.tmp")
+        self.file.seek(0)
+        self.file.write(HEADER.pack(EDGES_MAGIC, EDGES_VERSION, self.pages, self.edges))
+        self.file.close()
+        self.names.close()
+        os.replace(self.path + ".pages.tmp", self.path + ".pages")
+        os.replace(self.path + ".tmp", self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        if exc[0] is None:
+            self.close()
+        else:
+            for f in [self.file, self.degrees, self.names]:
+                f.close()
+                os.remove(f.name)
+
+
+class EdgeList():
+    """
+    Memory-mapped edge list file written by EdgeListWriter. Nothing is read
+    until a sweep streams the `edges` and `degrees` arrays block by block.
+    """
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self.buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, pages, edges = HEADER.unpack_from(self.buffer)
+        if magic != EDGES_MAGIC or version != EDGES_VERSION:
+            self.buffer.close()
+            raise ValueError(f"{path} is not an edge list file")
+        self.pages = pages
+        start = HEADER.size
+        self.edges = np.frombuffer(self.buffer, ID_TYPE, edges * 2, start).reshape(edges, 2)
+        start += self.edges.nbytes
+        self.degrees = np.frombuffer(self.buffer, ID_TYPE, pages, start)
+
+    def __len__(self):
+        return self.pages
+
+    def close(self):
+        """
+        Release the memory map.
+        """
+        del self.edges, self.degrees
+        self.buffer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def write_corpus(corpus, path):
+    """
+    Write a `crawl` corpus to the edge list file `path`, pages sorted by name.
+    """
+    pages = sorted(corpus)
+    index = {page: i for i, page in enumerate(pages)}
+    with EdgeListWriter(path) as writer:
+        for page in pages:
+            writer.add(page, [index[link] for link in corpus[page]])
+
+
+def write_directory(directory, path, processes=None):
+    """
+    Crawl a directory of HTML pages straight into the edge list file `path`,
+    one page at a time, and return (pages, edges) written.
+    """
+    pages = sorted(
+        entry.name for entry in os.scandir(directory)
+        if entry.name.endswith(".html") and entry.is_file()
+    )
+    index = {page: i for i, page in enumerate(pages)}
+    with EdgeListWriter(path) as writer:
+        for i, (characters, hrefs) in enumerate(parse_files(directory, pages, processes)):
+            writer.add(pages[i], {index[href] for href in hrefs if href in index} - {i})
+    return writer.pages, writer.edges
+
+
+def read_pages(path, ids=None):
+    """
+    Return a dictionary of page id -> name from the `<path>.pages` file
+    of an edge list, for every page or only for `ids`.
+    """
+    names = {}
+    with open(path + ".pages", encoding="utf-8") as f:
+        for i, line in enumerate(f):
+            if ids is None or i in ids:
+                names[i] = line[:-1]
+    return names
+
+
+def streaming_sweep(graph, ranks, damping_factor):
+    """
+    Return one PageRank sweep from `ranks` on an EdgeList, streaming its
+    edges and out-degrees block by block. Dangling pages are treated as
+    linking to every page, as in `LinkGraph.step`.
+    """
+    new_ranks = np.zeros(len(graph))
+    for start in range(0, len(graph.edges), EDGE_BLOCK):
+        block = np.array(graph.edges[start:start + EDGE_BLOCK])
+        sources, targets = block[:, 0], block[:, 1]
+        np.add.at(new_ranks, targets, ranks[sources] / graph.degrees[sources])
+
+    dangling = 0
+    for start in range(0, len(graph), PAGE_BLOCK):
+        degrees = np.array(graph.degrees[start:start + PAGE_BLOCK])
+        dangling += ranks[start:start + PAGE_BLOCK][degrees == 0].sum()
+    new_ranks *= damping_factor
+    new_ranks += (1 - damping_factor + damping_factor * dangling) / len(graph)
+    return new_ranks
+
+
+def streaming_power_iteration(graph, damping_factor, tolerance=TOLERANCE, max_iterations=MAX_ITERATIONS, stats=None):
+    """
+    Run PageRank power iteration on an EdgeList, like `power_iteration`,
+    holding only the current and next rank vectors in memory.
+
+    Return (ranks, iterations) where `ranks` is a NumPy vector summing to 1.
+    """
+    start = time.perf_counter()
+    ranks = np.full(len(graph), 1 / len(graph))
+    for iteration in range(1, max_iterations + 1):
+        sweep_start = time.perf_counter()
+        new_ranks = streaming_sweep(graph, ranks, damping_factor)
+        ranks -= new_ranks
+        np.abs(ranks, out=ranks)
+        change = ranks.sum()
+        if stats is not None:
+            stats.sweep(float(change), float(ranks.max()), time.perf_counter() - sweep_start)
+        ranks = new_ranks
+        if change < tolerance:
+            break
+    if stats is not None:
+        stats.finish(time.perf_counter() - start)
+    return ranks / ranks.sum(), iteration
+
+
+def outofcore_pagerank(corpus, damping_factor, path, tolerance=TOLERANCE):
+    """
+    Return (PageRank dictionary, iterations) for a `crawl` corpus like
+    `matrix_pagerank`, by writing it to the edge list file `path` and
+    streaming it from disk.
+    """
+    write_corpus(corpus, path)
+    with EdgeList(path) as graph:
+        ranks, iterations = streaming_power_iteration(graph, damping_factor, tolerance)
+    names = read_pages(path)
+    return {names[i]: float(rank) for i, rank in enumerate(ranks)}, iterations
+
+
+if __name__ == "__main__":
+    main()
@@ -1,24 +1,41 @@
+import json
 import os
 import random
 import re
 import sys
+import time
+
+from instrumentation import PageRankStats
 
 DAMPING = 0.85
 SAMPLES = 1000000
 
+# Sampling estimates recorded per run when instrumented
+CHECKPOINTS = 20
+
 
 def main():
-    if len(sys.argv) != 2:
-        sys.exit("Usage: python pagerank.py corpus")
+    if len(sys.argv) not in [2, 4] or (len(sys.argv) == 4 and sys.argv[2] != "--stats"):
+        sys.exit("Usage: python pagerank.py corpus [--stats file.json]")
     corpus = crawl(sys.argv[1])
-    ranks = sample_pagerank(corpus, DAMPING, SAMPLES)
+    runs = {}
+    if len(sys.argv) == 4:
+        runs = {method: PageRankStats(method) for method in ["sample_pagerank", "iterate_pagerank", "matrix_pagerank"]}
+    ranks = sample_pagerank(corpus, DAMPING, SAMPLES, runs.get("sample_pagerank"))
     print(f"PageRank Results from Sampling (n = {SAMPLES})")
     for page in sorted(ranks):
         print(f"  {page}: {ranks[page]:.4f}")
-    ranks = iterate_pagerank(corpus, DAMPING)
+    ranks = iterate_pagerank(corpus, DAMPING, runs.get("iterate_pagerank"))
     print(f"PageRank Results from Iteration")
     for page in sorted(ranks):
         print(f"  {page}: {ranks[page]:.4f}")
+    if runs:
+        # Only instrumented runs compare against the NumPy engine, so only they need NumPy
+        from matrix import matrix_pagerank
+        matrix_pagerank(corpus, DAMPING, stats=runs["matrix_pagerank"])
+        with open(sys.argv[3], "w") as f:
+            json.dump({"corpus": sys.argv[1], "pages": len(corpus), "damping": DAMPING,
+                       "runs": [stats.as_dict() for stats in runs.values()]}, f, indent=2)
 
 
 def crawl(directory):
@@ -70,7 +87,7 @@ def transition_model(corpus, page, damping_factor):
     return prob_dict
 
 
-def sample_pagerank(corpus, damping_factor, n):
+def sample_pagerank(corpus, damping_factor, n, stats=None):
     """
     Return PageRank values for each page by sampling `n` pages
     according to transition model, starting with a page at random.
@@ -78,10 +95,15 @@ def sample_pagerank(corpus, damping_factor, n):
     Return a dictionary where keys are page names, and values are
     their estimated PageRank value (a value between 0 and 1). All
     PageRank values should sum to 1.
+
+    If `stats` is a PageRankStats, the estimate is recorded there at
+    CHECKPOINTS evenly spaced points, with the sampling rate.
     """
     PR = dict()
     for page in corpus:
         PR[page] = 0
+    start = time.perf_counter()
+    interval = max(1, n // CHECKPOINTS)
     page = random.choice(list(corpus.keys()))
     for i in range(n):
         PR[page] += 1
@@ -92,12 +114,16 @@ def sample_pagerank(corpus, damping_factor, n):
             if rand < 0:
                 page = link
                 break
+        if stats is not None and (i + 1) % interval == 0:
+            stats.checkpoint(PR, i + 1, time.perf_counter() - start)
+    if stats is not None:
+        stats.finish(time.perf_counter() - start, n)
     for page in PR:
         PR[page] /= n
     return PR
 
 
-def iterate_pagerank(corpus, damping_factor):
+def iterate_pagerank(corpus, damping_factor, stats=None):
     """
     Return PageRank values for each page by iteratively updating
     PageRank values until convergence.
@@ -105,12 +131,16 @@ def iterate_pagerank(corpus, damping_factor):
     Return a dictionary where keys are page names, and values are
     their estimated PageRank value (a value between 0 and 1). All
     PageRank values should sum to 1.
+
+    If `stats` is a PageRankStats, every sweep's change and time is recorded there.
     """
     PR = dict()
     for page in corpus:
         PR[page] = 1 / len(corpus)
+    start = time.perf_counter()
     flag = True
     while flag:
+        sweep_start = time.perf_counter()
         flag = False
         PR_new = dict()
         for page in corpus:
@@ -122,7 +152,13 @@ def iterate_pagerank(corpus, damping_factor):
             if abs(PR[page] - PR_new[page]) > 0.0001:
                 flag = True
                 break
+        if stats is not None:
+            seconds = time.perf_counter() - sweep_start
+            changes = [abs(PR[page] - PR_new[page]) for page in PR]
+            stats.sweep(sum(changes), max(changes), seconds)
         PR = PR_new
+    if stats is not None:
+        stats.finish(time.perf_counter() - start)
     PR_sum = sum(PR.values())
     for page in PR:
         PR[page] /= PR_sum
@@ -0,0 +1,122 @@
+import heapq
+import sys
+from collections import defaultdict, deque
+
+from crawler import cached_crawl
+from pagerank import DAMPING
+
+# Pages are pushed while their residual exceeds this much per out-link;
+# the work is O(1 / (EPSILON * (1 - DAMPING))) pushes regardless of corpus size
+EPSILON = 1e-6
+
+# Pages listed by the command line
+TOP_K = 10
+
+
+def main():
+    if len(sys.argv) < 3:
+        sys.exit("Usage: python personalized.py corpus seed [seed ...]")
+    corpus = cached_crawl(sys.argv[1])
+    try:
+        pages = top_pages(corpus, sys.argv[2:], TOP_K, DAMPING)
+    except ValueError as e:
+        sys.exit(e)
+    print(f"Pages most relevant to {', '.join(sys.argv[2:])}")
+    for page, rank in pages:
+        print(f"  {page}: {rank:.4f}")
+
+
+def teleport_vector(corpus, seeds):
+    """
+    Return a dictionary of page -> teleport probability for `seeds`: a
+    single page, a collection of pages weighted equally, or a dictionary
+    of page -> weight.
+    """
+    if isinstance(seeds, str):
+        seeds = {seeds: 1}
+    elif not isinstance(seeds, dict):
+        seeds = {seed: 1 for seed in seeds}
+    for seed, weight in seeds.items():
+        if seed not in corpus:
+            raise ValueError(f"seed {seed} is not in the corpus")
+        if weight < 0:
+            raise ValueError(f"seed {seed} has a negative weight")
+    total = sum(seeds.values())
+    if total <= 0:
+        raise ValueError("seeds need a positive total weight")
+    return {seed: weight / total for seed, weight in seeds.items() if weight > 0}
+
+
+def forward_push(corpus, seeds, damping_factor, epsilon=EPSILON):
+    """
+    Approximate personalized PageRank for `seeds` on a `crawl` corpus,
+    where random jumps, and every step from a page without links, land
+    on the seeds instead of anywhere in the corpus.
+
+    Return (ranks, residual, pushes): `ranks` maps only the pages reached
+    to their estimate, which undercounts the exact value by at most the
+    total `residual` still waiting to be pushed.
+
+    Each push keeps (1 - d) of a page's residual as rank and hands the
+    rest to its links, and only pages holding more than `epsilon` per
+    out-link are pushed, so the query touches the neighbourhood of the
+    seeds instead of sweeping the whole corpus.
+    """
+    teleport = teleport_vector(corpus, seeds)
+    ranks = defaultdict(float)
+    residual = defaultdict(float, teleport)
+    queue = deque(teleport)
+    queued = set(queue)
+    pushes = 0
+    while queue:
+        page = queue.popleft()
+        queued.discard(page)
+        links = corpus[page]
+        r = residual[page]
+        if r <= epsilon * max(len(links), 1):
+            continue
+        pushes += 1
+        ranks[page] += (1 - damping_factor) * r
+        residual[page] = 0.0
+
+        # Pages without links send the surfer back to the seeds
+        if links:
+            targets = [(link, damping_factor * r / len(links)) for link in links]
+        else:
+            targets = [(seed, damping_factor * r * weight) for seed, weight in teleport.items()]
+        for link, share in targets:
+            residual[link] += share
+            if link not in queued and residual[link] > epsilon * max(len(corpus[link]), 1):
+                queue.append(link)
+                queued.add(link)
+
+    residual = {page: r for page, r in residual.items() if r > 0}
+    return dict(ranks), residual, pushes
+
+
+def personalized_pagerank(corpus, seeds, damping_factor, epsilon=EPSILON):
+    """
+    Return a dictionary of personalized PageRank estimates for `seeds`,
+    computed by `forward_push`. Pages that were never reached are omitted.
+    """
+    ranks, _, _ = forward_push(corpus, seeds, damping_factor, epsilon)
+    return ranks
+
+
+def top_pages(corpus, seeds, k, damping_factor, epsilon=EPSILON, include_seeds=False):
+    """
+    Return a list of the `k` (page, rank) pairs with the highest
+    personalized PageRank for `seeds`, best first. The seeds themselves
+    are left out unless `include_seeds` is set.
+    """
+    teleport = teleport_vector(corpus, seeds)
+    ranks = personalized_pagerank(corpus, teleport, damping_factor, epsilon)
+    candidates = [
+        (page, rank) for page, rank in ranks.items()
+        if include_seeds or page not in teleport
+    ]
+    return heapq.nsmallest(k, candidates, key=lambda item: (-item[1], item[0]))
+
+
+if __name__ == "__main__":
+    main()
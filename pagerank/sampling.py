@@ -0,0 +1,222 @@
+import multiprocessing
+import os
+import random
+
+import numpy as np
+
+from matrix import LinkGraph
+
+# Surfers advanced in lockstep by `walk`
+WALKERS = 1024
+
+# Steps each surfer takes before counting, so that starting uniformly at
+# random does not bias the counts (the start is forgotten at rate DAMPING^t)
+BURN_IN = 50
+
+# Graph shared read-only with forked worker processes
+shared_graph = None
+
+
+class AliasTable():
+    """
+    Walker alias table for drawing from a fixed discrete distribution in O(1):
+    column `i` is chosen uniformly, then kept with probability `probability[i]`
+    or swapped for `alias[i]` otherwise.
+    """
+    def __init__(self, weights):
+        n = len(weights)
+        total = sum(weights)
+        if n == 0 or total <= 0:
+            raise ValueError("alias table needs a positive total weight")
+        scaled = [weight * n / total for weight in weights]
+        self.probability = [1.0] * n
+        self.alias = list(range(n))
+
+        # Vose's method: pair each under-full column with an over-full one
+        small = [i for i, weight in enumerate(scaled) if weight < 1]
+        large = [i for i, weight in enumerate(scaled) if weight >= 1]
+        while small and large:
+            less, more = small.pop(), large.pop()
+            self.probability[less] = scaled[less]
+            self.alias[less] = more
+            scaled[more] -= 1 - scaled[less]
+            if scaled[more] < 1:
+                small.append(more)
+            else:
+                large.append(more)
+
+    def __len__(self):
+        return len(self.alias)
+
+    def draw(self, u):
+        """
+        Return an index for a uniform number `u` in [0, 1).
+        """
+        u *= len(self.alias)
+        column = int(u)
+        return column if u - column < self.probability[column] else self.alias[column]
+
+
+class Sampler():
+    """
+    Random surfer over a `crawl` corpus with every page's out-links, and any
+    non-uniform distribution, precomputed so that each step costs O(1) and a
+    single random draw.
+
+    `link_weights` optionally maps a page to {linked page: weight}, and
+    `teleport` optionally maps pages to weights for random jumps; both are
+    drawn from with alias tables. Otherwise both choices are uniform.
+    """
+    def __init__(self, corpus, damping_factor, link_weights=None, teleport=None):
+        self.pages = sorted(corpus)
+        index = {page: i for i, page in enumerate(self.pages)}
+        self.damping_factor = damping_factor
+        self.links = [tuple(index[link] for link in sorted(corpus[page])) for page in self.pages]
+
+        self.link_tables = [None] * len(self.pages)
+        for page, weights in (link_weights or {}).items():
+            links = self.links[index[page]]
+            self.link_tables[index[page]] = AliasTable([weights.get(self.pages[link], 0) for link in links])
+
+        self.teleport = None
+        if teleport is not None:
+            self.teleport = AliasTable([teleport.get(page, 0) for page in self.pages])
+
+    def jump(self, u):
+        """
+        Return a random page index to teleport to, for a uniform `u` in [0, 1).
+        """
+        if self.teleport is not None:
+            return self.teleport.draw(u)
+        return int(u * len(self.pages))
+
+    def step(self, page, u):
+        """
+        Return the page index visited after `page`, for a uniform `u` in [0, 1):
+        below the damping factor a link is followed, above it the surfer jumps.
+        Pages without links always jump.
+        """
+        links = self.links[page]
+        if u < self.damping_factor and links:
+            u /= self.damping_factor
+            table = self.link_tables[page]
+            return links[table.draw(u) if table is not None else int(u * len(links))]
+        if links:
+            u = (u - self.damping_factor) / (1 - self.damping_factor)
+        return self.jump(u)
+
+    def visits(self, n, rng=None, start=None):
+        """
+        Return a list of visit counts per page index over a walk of `n` pages,
+        starting from `start` or from a random jump.
+        """
+        rng = rng or random
+        counts = [0] * len(self.pages)
+        page = self.jump(rng.random()) if start is None else start
+        step = self.step
+        draw = rng.random
+        for i in range(n):
+            counts[page] += 1
+            page = step(page, draw())
+        return counts
+
+    def ranks(self, counts):
+        """
+        Return visit counts as a dictionary of page -> share of all visits.
+        """
+        total = sum(counts)
+        return {page: count / total for page, count in zip(self.pages, counts)}
+
+
+def alias_pagerank(corpus, damping_factor, n, seed=None):
+    """
+    Return PageRank values for each page by sampling `n` pages, like
+    `sample_pagerank`, but with O(1) precomputed steps.
+    """
+    sampler = Sampler(corpus, damping_factor)
+    return sampler.ranks(sampler.visits(n, random.Random(seed)))
+
+
+def advance(graph, positions, damping_factor, rng):
+    """
+    Return the next page index of every surfer in `positions` on a LinkGraph:
+    with probability `damping_factor` a surfer follows a random out-link,
+    otherwise (or from a dangling page) it jumps to a random page.
+    """
+    draws = rng.random(len(positions))
+    degree = graph.out_degree[positions]
+    follow = (draws < damping_factor) & (degree > 0)
+    choice = np.minimum((draws[follow] / damping_factor * degree[follow]).astype(np.int64), degree[follow] - 1)
+
+    next_positions = np.empty_like(positions)
+    next_positions[follow] = graph.indices[graph.indptr[positions[follow]] + choice]
+    jump = ~follow
+    next_positions[jump] = rng.integers(len(graph), size=int(jump.sum()))
+    return next_positions
+
+
+def walk(graph, damping_factor, n, walkers=WALKERS, seed=None):
+    """
+    Return a NumPy array of visit counts per page index over `n` visits shared
+    by `walkers` independent surfers on a LinkGraph, advanced in lockstep.
+    """
+    rng = np.random.default_rng(seed)
+    positions = rng.integers(len(graph), size=walkers)
+    for i in range(BURN_IN):
+        positions = advance(graph, positions, damping_factor, rng)
+
+    # Buffer visits and count them about once per `len(graph)` visits,
+    # so that bincount's O(pages) cost is not paid on every step
+    counts = np.zeros(len(graph), dtype=np.int64)
+    buffered = []
+    buffered_visits = 0
+    remaining = n
+    while remaining > 0:
+        visits = positions[:remaining]
+        buffered.append(visits)
+        buffered_visits += len(visits)
+        remaining -= len(visits)
+        if buffered_visits >= len(graph) or remaining == 0:
+            counts += np.bincount(np.concatenate(buffered), minlength=len(graph))
+            buffered, buffered_visits = [], 0
+        positions = advance(graph, positions, damping_factor, rng)
+    return counts
+
+
+def parallel_walk(graph, damping_factor, n, processes=None, walkers=WALKERS, seed=None):
+    """
+    Split `n` visits across `processes` forked workers, each running `walk`
+    with its own independent random stream spawned from `seed`, and return
+    the merged visit counts.
+    """
+    processes = processes or os.cpu_count()
+    seeds = np.random.SeedSequence(seed).spawn(processes)
+    shares = [n // processes + (1 if i < n % processes else 0) for i in range(processes)]
+    if processes == 1:
+        return walk(graph, damping_factor, n, walkers, seeds[0])
+
+    global shared_graph
+    shared_graph = graph
+    context = multiprocessing.get_context("fork")
+    with context.Pool(processes) as pool:
+        results = pool.starmap(walk_shared, [
+            (damping_factor, share, walkers, child) for share, child in zip(shares, seeds)
+        ])
+    return sum(results)
+
+
+def walk_shared(damping_factor, n, walkers, seed):
+    """
+    Run `walk` on the graph inherited from the parent process.
+    """
+    return walk(shared_graph, damping_factor, n, walkers, seed)
+
+
+def batch_pagerank(corpus, damping_factor, n, processes=None, seed=None):
+    """
+    Return PageRank values for each page by sampling `n` pages with many
+    lockstep surfers, spread over `processes` worker processes.
+    """
+    graph = LinkGraph.from_corpus(corpus)
+    counts = parallel_walk(graph, damping_factor, n, processes, seed=seed)
+    return graph.ranks(counts / counts.sum())
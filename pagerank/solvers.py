@@ -0,0 +1,242 @@
+import time
+
+import numpy as np
+
+from matrix import MAX_ITERATIONS, TOLERANCE, LinkGraph, power_iteration
+
+# Pages updated together by `gauss_seidel`; each block sees the new ranks of
+# every earlier block, and larger blocks trade that for fewer NumPy calls
+BLOCK_SIZE = 4096
+
+# Smaller graphs are split into at least this many blocks, since one block
+# per sweep would only be a Jacobi sweep
+MIN_BLOCKS = 16
+
+# Iterations between extrapolations
+EXTRAPOLATION_PERIOD = 10
+
+# `adaptive` stops following links into a page once the rank it receives
+# through them changes by less than this fraction of its share of `tolerance`
+FREEZE_RATIO = 1
+
+# Sweeps in a row a page must stay under that threshold before it is frozen;
+# a page can pass it once by chance while its in-links are still changing
+CALM_SWEEPS = 2
+
+
+def gauss_seidel(graph, damping_factor, tolerance=TOLERANCE, max_iterations=MAX_ITERATIONS, stats=None,
+                 block_size=BLOCK_SIZE):
+    """
+    Solve PageRank on a LinkGraph with block Gauss-Seidel sweeps: pages are
+    updated a block at a time from incoming links, using the ranks already
+    updated earlier in the same sweep, until the L1 change of a sweep is
+    below `tolerance`. Blocks hold `block_size` pages, fewer on graphs
+    too small for MIN_BLOCKS of them.
+
+    Return (ranks, iterations) like `power_iteration`.
+    """
+    start = time.perf_counter()
+    n = len(graph)
+    block_size = max(1, min(block_size, -(-n // MIN_BLOCKS)))
+    indptr, sources, targets = graph.in_links()
+    weight = np.divide(damping_factor, graph.out_degree, out=np.zeros(n), where=~graph.dangling)
+    ranks = np.full(n, 1 / n)
+    flow = ranks * weight
+    dangling = ranks[graph.dangling].sum()
+    for iteration in range(1, max_iterations + 1):
+        sweep_start = time.perf_counter()
+        change = 0
+        largest = 0
+        for low in range(0, n, block_size):
+            high = min(n, low + block_size)
+            edges = slice(indptr[low], indptr[high])
+            received = np.bincount(targets[edges] - low, weights=flow[sources[edges]], minlength=high - low)
+            new_ranks = (1 - damping_factor + damping_factor * dangling) / n + received
+            delta = new_ranks - ranks[low:high]
+            ranks[low:high] = new_ranks
+            flow[low:high] = new_ranks * weight[low:high]
+            dangling += delta[graph.dangling[low:high]].sum()
+            change += np.abs(delta).sum()
+            largest = max(largest, np.abs(delta).max())
+
+        # Sweeps do not preserve the total rank as Jacobi sweeps do, and
+        # renormalising keeps the slowly decaying error in the total out
+        ranks /= ranks.sum()
+        flow = ranks * weight
+        dangling = ranks[graph.dangling].sum()
+        if stats is not None:
+            stats.sweep(float(change), float(largest), time.perf_counter() - sweep_start)
+        if change < tolerance:
+            break
+    if stats is not None:
+        stats.finish(time.perf_counter() - start)
+    return ranks / ranks.sum(), iteration
+
+
+def aitken(history):
+    """
+    Return the componentwise Aitken delta-squared extrapolation
+    of the last three iterates in `history`.
+    """
+    x0, x1, x2 = history[-3:]
+    denominator = x2 - 2 * x1 + x0
+    extrapolated = x2.copy()
+    safe = np.abs(denominator) > 1e-300
+    extrapolated[safe] -= (x2[safe] - x1[safe]) ** 2 / denominator[safe]
+    return extrapolated
+
+
+def quadratic(history):
+    """
+    Return the quadratic extrapolation of the last four iterates in
+    `history` (Kamvar et al.), which removes the two next-largest
+    eigenvector components by a least-squares fit.
+    """
+    x0, x1, x2, x3 = history[-4:]
+    y = np.column_stack([x1 - x0, x2 - x0])
+    (g1, g2), *_ = np.linalg.lstsq(y, -(x3 - x0), rcond=None)
+    return (g1 + g2 + 1) * x1 + (g2 + 1) * x2 + x3
+
+
+def extrapolated_iteration(graph, damping_factor, tolerance=TOLERANCE, max_iterations=MAX_ITERATIONS, stats=None,
+                           extrapolate=quadratic, period=EXTRAPOLATION_PERIOD):
+    """
+    Run power iteration on a LinkGraph, replacing the ranks every `period`
+    iterations with `extrapolate` applied to the recent iterates, clipped
+    to be non-negative and renormalised.
+
+    Return (ranks, iterations) like `power_iteration`.
+    """
+    start = time.perf_counter()
+    ranks = np.full(len(graph), 1 / len(graph))
+    history = [ranks]
+    for iteration in range(1, max_iterations + 1):
+        sweep_start = time.perf_counter()
+        new_ranks = graph.step(ranks, damping_factor)
+        changes = np.abs(new_ranks - ranks)
+        change = changes.sum()
+        ranks = new_ranks
+        history = history[-3:] + [ranks]
+        if change < tolerance:
+            if stats is not None:
+                stats.sweep(float(change), float(changes.max()), time.perf_counter() - sweep_start)
+            break
+        if iteration % period == 0 and len(history) == 4:
+            ranks = np.maximum(extrapolate(history), 0)
+            ranks /= ranks.sum()
+            history = [ranks]
+        if stats is not None:
+            stats.sweep(float(change), float(changes.max()), time.perf_counter() - sweep_start)
+    if stats is not None:
+        stats.finish(time.perf_counter() - start)
+    return ranks / ranks.sum(), iteration
+
+
+def aitken_iteration(graph, damping_factor, tolerance=TOLERANCE, max_iterations=MAX_ITERATIONS, stats=None):
+    """
+    Power iteration with periodic Aitken extrapolation.
+    """
+    return extrapolated_iteration(graph, damping_factor, tolerance, max_iterations, stats, aitken)
+
+
+def quadratic_iteration(graph, damping_factor, tolerance=TOLERANCE, max_iterations=MAX_ITERATIONS, stats=None):
+    """
+    Power iteration with periodic quadratic extrapolation.
+    """
+    return extrapolated_iteration(graph, damping_factor, tolerance, max_iterations, stats, quadratic)
+
+
+def adaptive(graph, damping_factor, tolerance=TOLERANCE, max_iterations=MAX_ITERATIONS, stats=None):
+    """
+    Run power iteration on a LinkGraph that stops recomputing pages once
+    they have converged (Kamvar et al.'s adaptive PageRank). Only links into
+    still-active pages are followed each sweep, while the rank a frozen page
+    receives through its links is kept; the random-jump share of every page
+    is still updated, as it is a single number. When the active pages
+    settle, a full sweep checks the usual L1 criterion, and every page is
+    reactivated if it fails.
+
+    Freezing saves little on power-law graphs: the pages that stay active
+    longest are the high in-degree ones with the largest ranks, and they
+    hold nearly all the links, so sweeps follow about as many links as
+    power iteration, plus the checking sweeps.
+
+    Return (ranks, iterations) like `power_iteration`.
+    """
+    start = time.perf_counter()
+    n = len(graph)
+    all_sources = np.repeat(np.arange(n), graph.out_degree)
+    all_targets = graph.indices
+    weight = np.divide(damping_factor, graph.out_degree, out=np.zeros(n), where=~graph.dangling)
+    ranks = np.full(n, 1 / n)
+    received = np.zeros(n)
+    threshold = FREEZE_RATIO * tolerance / n
+    active = np.arange(n)
+    calm = np.zeros(n, dtype=int)
+    sources, targets = all_sources, all_targets
+    for iteration in range(1, max_iterations + 1):
+        sweep_start = time.perf_counter()
+        spread = (1 - damping_factor + damping_factor * ranks[graph.dangling].sum()) / n
+        if len(active) == n:
+            new_received = damping_factor * graph.propagate(ranks)
+            link_changes = np.abs(new_received - received)
+            received = new_received
+        else:
+            active_received = np.bincount(targets, weights=(ranks * weight)[sources], minlength=len(active))
+            link_changes = np.abs(active_received - received[active])
+            received[active] = active_received
+        new_ranks = spread + received
+        changes = np.abs(new_ranks - ranks)
+        change = changes.sum()
+        ranks = new_ranks
+        if stats is not None:
+            stats.sweep(float(change), float(changes.max()), time.perf_counter() - sweep_start)
+
+        if change < tolerance:
+            if len(active) == n:
+                break
+            # Check every page before stopping, and start over if some moved
+            threshold /= 10
+            active = np.arange(n)
+            calm = np.zeros(n, dtype=int)
+            sources, targets = all_sources, all_targets
+            continue
+
+        # Freeze converged pages, keeping only links into the remaining ones,
+        # with targets renumbered to positions in `active`
+        calm = np.where(link_changes < threshold, calm + 1, 0)
+        moving = calm < CALM_SWEEPS
+        if not moving.all():
+            calm = calm[moving]
+            kept = moving[targets]
+            position = np.full(len(active), -1)
+            position[moving] = np.arange(moving.sum())
+            sources = sources[kept]
+            targets = position[targets[kept]]
+            active = active[moving]
+    if stats is not None:
+        stats.finish(time.perf_counter() - start)
+    return ranks / ranks.sum(), iteration
+
+
+# Solvers by name, each called as solver(graph, damping_factor, tolerance,
+# max_iterations, stats) and returning (ranks, iterations)
+SOLVERS = {
+    "power": power_iteration,
+    "gauss_seidel": gauss_seidel,
+    "aitken": aitken_iteration,
+    "quadratic": quadratic_iteration,
+    "adaptive": adaptive,
+}
+
+
+def solve_pagerank(corpus, damping_factor, solver="power", tolerance=TOLERANCE, stats=None):
+    """
+    Return (PageRank dictionary, iterations) for a `crawl` corpus,
+    computed by the named solver in SOLVERS.
+    """
+    if solver not in SOLVERS:
+        raise ValueError(f"unknown solver {solver}, expected one of {', '.join(SOLVERS)}")
+    graph = LinkGraph.from_corpus(corpus)
+    ranks, iterations = SOLVERS[solver](graph, damping_factor, tolerance, MAX_ITERATIONS, stats=stats)
+    return graph.ranks(ranks), iterations